@@ -1,69 +1,248 @@
 import sys
 import numpy as np
 import sounddevice as sd
-import queue
 import threading
-from PyQt5.QtCore import QThread, pyqtSignal
-from constants import TRANSCRIPT_CHUNK_DURATION_SECONDS # Not directly used here, but good practice to keep context
+from PyQt5.QtCore import QObject, pyqtSignal
+from constants import TRANSCRIPT_CHUNK_DURATION_SECONDS
 
-class AudioCaptureThread(QThread):
+# PortAudio device enumeration is a full host-API scan, so it is done once per process
+_DEVICE_CACHE = None
+
+def _get_devices():
+    global _DEVICE_CACHE
+    if _DEVICE_CACHE is None:
+        _DEVICE_CACHE = sd.query_devices()
+    return _DEVICE_CACHE
+
+
+class _AudioRing:
+    """
+    Fixed-capacity single-producer/single-consumer ring of preallocated audio slots with
+    overwrite-oldest semantics: a stalled consumer costs the oldest audio, never unbounded memory.
+    The PortAudio callback is the only writer of `claim_pos`/`write_pos` and the capture loop the
+    only writer of `read_pos`, so neither side ever needs to take a lock.
+    """
+    def __init__(self, slots, frames, dtype=np.int16):
+        if slots < 2 or slots & (slots - 1):
+            raise ValueError(f"Ring slot count must be a power of two, got {slots}")
+        self._capacity = slots
+        self._mask = slots - 1
+        self._slots = np.zeros((slots, frames), dtype=dtype)
+        self._lengths = np.zeros(slots, dtype=np.int64)
+        self.claim_pos = 0 # Sequence number the producer is (or was last) writing, plus one
+        self.write_pos = 0
+        self.read_pos = 0
+        self.overwritten = 0 # Blocks lost to the producer lapping the consumer
+
+    def reset(self):
+        self.claim_pos = 0
+        self.write_pos = 0
+        self.read_pos = 0
+        self.overwritten = 0
+
+    def push(self, block):
+        """Producer side: copies `block` into the next slot, evicting the oldest block when the ring is full."""
+        write_pos = self.write_pos
+        self.claim_pos = write_pos + 1 # Announce the slot before touching it so the reader can detect a torn copy
+        idx = write_pos & self._mask
+        n = min(len(block), self._slots.shape[1])
+        np.copyto(self._slots[idx, :n], block[:n])
+        self._lengths[idx] = n
+        self.write_pos = write_pos + 1 # Publish the slot only after its samples are in place
+
+    def pop_into(self, out):
+        """
+        Consumer side: copies the oldest unread block into `out`. Returns the number of samples copied,
+        0 if the ring is empty, or -1 if the producer overwrote the slot while it was being copied.
+        """
+        lapped = self.claim_pos - self._capacity
+        if lapped > self.read_pos:
+            # The producer has lapped us; skip straight to the oldest block that is still intact
+            self.overwritten += lapped - self.read_pos
+            self.read_pos = lapped
+        read_pos = self.read_pos
+        if read_pos == self.write_pos:
+            return 0
+        idx = read_pos & self._mask
+        n = int(self._lengths[idx])
+        np.copyto(out[:n], self._slots[idx, :n])
+        self.read_pos = read_pos + 1
+        if self.claim_pos - read_pos > self._capacity:
+            self.overwritten += 1
+            return -1
+        return n
+
+    def __len__(self):
+        return min(self.write_pos - self.read_pos, self._capacity)
+
+
+class AudioCaptureThread(QObject):
+    """
+    Captures microphone audio on a plain daemon thread. The loop only emits signals and never needs
+    a Qt event loop, so a QThread is unnecessary; start/stop/wait/isRunning mirror the QThread API.
+    """
     audio_data = pyqtSignal(np.ndarray)
     error_signal = pyqtSignal(str)
+    dropped_frames = pyqtSignal(int) # Running total of captured frames evicted because the consumer fell behind
 
-    def __init__(self, device_id=3, samplerate=16000):
+    def __init__(self, device_id=3, samplerate=16000, blocksize=512, ring_slots=16, emit_interval_seconds=1.0):
         super().__init__()
         self.device_id = device_id
         self.samplerate = samplerate
-        self._running = False
-        self._stop_event = threading.Event()
-        self.audio_queue = queue.Queue()
+        self.blocksize = blocksize
+        self.ring_slots = ring_slots
+        self.emit_interval_seconds = emit_interval_seconds
+        self._stop = threading.Event()
+        self._thread = None
+        self._data_ready = threading.Condition() # Notified by the PortAudio callback after each block
 
-    def run(self):
-        self._running = True
-        self._stop_event.clear()
+        # Capture buffers are sized in run() once the device's native rate is known
+        self._decimation = 1
+        self._ring = None
+        self._block = None
+        self._dropped_reported = 0
+        self._accum = None
+        self._fill = 0
+        self._emit_threshold = 0
+        self._lowpass = None
+        self._resample_history = None
+        self._resample_phase = 0
+
+    def _configure_capture(self, device_info):
+        """
+        Chooses the stream rate. When the device's native rate is an integer multiple of the target
+        rate (e.g. 48 kHz -> 16 kHz) the stream is opened natively and decimated here in batches,
+        instead of letting PortAudio run its own resampler inside the realtime callback.
+        """
+        native_rate = int(device_info.get('default_samplerate') or self.samplerate)
+        if native_rate > self.samplerate and native_rate % self.samplerate == 0:
+            self._decimation = native_rate // self.samplerate
+        else:
+            self._decimation = 1
+        capture_rate = self.samplerate * self._decimation
+        frames = self.blocksize * self._decimation # Keep the callback period independent of the rate
 
+        # Audio is captured as native 16-bit PCM; conversion to float32 happens once per emitted batch
+        self._ring = _AudioRing(self.ring_slots, frames, dtype=np.int16)
+        self._block = np.empty(frames, dtype=np.int16) # Scratch copy so a torn slot never reaches the accumulator
+        self._dropped_reported = 0
+        # Blocks are coalesced here so that one Qt signal carries ~emit_interval_seconds of audio
+        self._accum = np.empty(capture_rate * TRANSCRIPT_CHUNK_DURATION_SECONDS, dtype=np.int16)
+        self._fill = 0
+        self._emit_threshold = min(int(capture_rate * self.emit_interval_seconds), len(self._accum))
+
+        if self._decimation > 1:
+            # Windowed-sinc low-pass just below the target Nyquist frequency
+            num_taps = 24 * self._decimation + 1
+            cutoff = 0.45 / self._decimation
+            n = np.arange(num_taps) - (num_taps - 1) / 2
+            taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(num_taps)
+            self._lowpass = (taps / taps.sum()).astype(np.float32)
+            self._resample_history = np.zeros(num_taps - 1, dtype=np.float32)
+            self._resample_phase = 0
+        return capture_rate
+
+    def _decimate(self, audio):
+        """Low-pass filters and downsamples a float32 batch, carrying filter state across batches."""
+        x = np.concatenate((self._resample_history, audio))
+        filtered = np.convolve(x, self._lowpass, mode='valid') # One output per input sample of `audio`
+        decimated = filtered[self._resample_phase::self._decimation]
+        self._resample_phase = (self._resample_phase - len(audio)) % self._decimation
+        self._resample_history = x[len(x) - len(self._resample_history):]
+        return decimated
+
+    def start(self):
+        if self.isRunning():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="AudioCaptureThread", daemon=True)
+        self._thread.start()
+
+    def isRunning(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def wait(self, msecs=None):
+        """Blocks until the capture thread exits or `msecs` elapse. Returns True if it has exited."""
+        if self._thread is None:
+            return True
+        self._thread.join(None if msecs is None else msecs / 1000.0)
+        return not self._thread.is_alive()
+
+    def _accumulate(self, block):
+        n = len(block)
+        if self._fill + n > len(self._accum):
+            self._flush_accum()
+        np.copyto(self._accum[self._fill:self._fill + n], block)
+        self._fill += n
+        if self._fill >= self._emit_threshold:
+            self._flush_accum()
+
+    def _flush_accum(self):
+        if self._fill:
+            # One new array per batch (it is handed to another thread), scaled in place rather than
+            # through a second temporary
+            audio = self._accum[:self._fill].astype(np.float32)
+            audio *= np.float32(1.0 / 32768.0)
+            if self._decimation > 1:
+                audio = self._decimate(audio)
+            self.audio_data.emit(audio)
+            self._fill = 0
+
+    def _report_dropped(self):
+        dropped = self._ring.overwritten * self._block.shape[0]
+        if dropped != self._dropped_reported:
+            self._dropped_reported = dropped
+            self.dropped_frames.emit(dropped)
+
+    def run(self):
         def callback(indata, frames, time_info, status):
             if status:
                 pass
-            if self._running:
-                self.audio_queue.put(indata.copy())
+            if not self._stop.is_set():
+                # Written straight into a preallocated slot; a full ring evicts its oldest block rather than blocking PortAudio
+                self._ring.push(indata[:, 0])
+                if self._data_ready.acquire(blocking=False):
+                    # Never block the realtime thread: if the consumer holds the lock it is awake anyway
+                    self._data_ready.notify()
+                    self._data_ready.release()
 
         try:
-            devices = sd.query_devices()
+            devices = _get_devices()
             if self.device_id >= len(devices):
                 raise ValueError(f"Device ID {self.device_id} is out of range. Available devices: {len(devices)}")
-            device_info = sd.query_devices(self.device_id)
+            device_info = devices[self.device_id]
             if device_info['max_input_channels'] < 1:
                 raise ValueError(f"Device {self.device_id} does not support audio input")
-            
-            with sd.InputStream(samplerate=self.samplerate,
+            capture_rate = self._configure_capture(device_info)
+
+            with sd.InputStream(samplerate=capture_rate,
                               device=self.device_id,
                               channels=1,
+                              dtype='int16',
+                              blocksize=self.blocksize * self._decimation,
                               callback=callback):
-                while self._running:
-                    try:
-                        audio_chunk = self.audio_queue.get(timeout=0.1)
-                        self.audio_data.emit(audio_chunk)
-                    except queue.Empty:
-                        if self._stop_event.is_set():
-                            break
+                while not self._stop.is_set():
+                    n = self._ring.pop_into(self._block)
+                    if n > 0:
+                        self._accumulate(self._block[:n])
+                    self._report_dropped()
+                    if n == 0:
+                        with self._data_ready:
+                            if not len(self._ring) and not self._stop.is_set():
+                                # The timeout only guards against a notify skipped by the non-blocking acquire
+                                self._data_ready.wait(timeout=0.1)
+                self._flush_accum() # Hand off whatever was captured before the stop request
         except Exception as e:
             error_msg = f"Audio Capture Critical Error: {str(e)}"
             if "device" in str(e).lower():
                 error_msg += f"\nAvailable audio devices:\n"
-                for i, dev in enumerate(sd.query_devices()):
+                for i, dev in enumerate(_get_devices()):
                     if dev['max_input_channels'] > 0:
                         error_msg += f"ID {i}: {dev['name']}\n"
             self.error_signal.emit(error_msg)
             print(error_msg, file=sys.stderr)
-        finally:
-            self._running = False
-            while not self.audio_queue.empty():
-                try:
-                    self.audio_queue.get_nowait()
-                except queue.Empty:
-                    break
 
     def stop(self):
-        self._running = False
-        self._stop_event.set()
\ No newline at end of file
+        self._stop.set()
+        with self._data_ready:
+            self._data_ready.notify()
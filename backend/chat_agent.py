@@ -1,27 +1,30 @@
+import functools
 import threading
-import json
 import queue
 import time
+import httpx
 import ollama
+import orjson
 from PyQt5.QtCore import QThread, pyqtSignal
+from constants import OLLAMA_HOST, OLLAMA_NUM_CTX
 
-class ChatThread(QThread):
-    chat_response = pyqtSignal(str)
-    chat_log = pyqtSignal(dict) 
+# Upper bound on transcript + cheat-sheet context sent with each chat query. Prompt length drives
+# prefill time, so older transcripts and low-importance entities are dropped beyond this budget.
+CHAT_CONTEXT_TOKEN_BUDGET = 2000
+CHAT_ENTITY_TOKEN_SHARE = 0.5 # Portion of the budget reserved for the cheat sheet
+CHAT_BATCH_WINDOW_SECONDS = 0.05 # Queries arriving this close together are answered in one request
+# Streamed tokens are forwarded to the GUI at most this often, several per queued signal
+CHAT_DELTA_EMIT_INTERVAL_SECONDS = 0.03
 
-    def __init__(self, transcript_getter, entities_getter, content_title, external_context):
-        super().__init__()
-        self.chat_queue = queue.Queue()
-        self.running = False
-        self.transcript_getter = transcript_getter
-        self.entities_getter = entities_getter
-        self.content_title = content_title
-        self.external_context = external_context
+DUPLICATE_QUERY_INTERVAL_SECONDS = 2.0
 
-        # ADDED: Event for responsive shutdown
-        self._stop_event = threading.Event()
+CHAT_MODEL = "llama3.2:latest"
+# Ollama unloads idle models; pinging before the keep-alive expires keeps the weights resident
+MODEL_KEEP_ALIVE = "30m"
+MODEL_KEEP_ALIVE_PING_SECONDS = 20 * 60
+_CHAT_OPTIONS = {"num_ctx": OLLAMA_NUM_CTX} # Must match the LLM thread so both share one loaded model
 
-        self.system_prompt = """
+CHAT_SYSTEM_PROMPT_TEMPLATE = """
 You are an AI assistant helping a user understand a story by answering questions based on the transcript history and a narrative cheat sheet.
 
 The content is titled: "{content_title}".
@@ -31,51 +34,211 @@ External context about the content:
 ---
 
 Answer user questions using the provided transcript history and cheat sheet. Provide detailled, relevant answers in plain text.
-""".format(content_title=self.content_title, external_context=self.external_context)
+"""
+
+# Title and context are fixed for a session, but a ChatThread is rebuilt whenever the context
+# is (re)loaded, so the rendered prompt is memoized across instances.
+@functools.lru_cache(maxsize=8)
+def _render_system_prompt(content_title, external_context):
+    return CHAT_SYSTEM_PROMPT_TEMPLATE.format(content_title=content_title, external_context=external_context)
+
+def _estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token for English text)."""
+    return len(text) // 4 + 1
+
+def _build_user_content(recent_transcripts, entities_json, queries):
+    """Assembles the per-query user message in a single join."""
+    parts = ["Transcript history:\n", "\n".join(recent_transcripts), "\n",
+             "Current narrative cheat sheet: ", entities_json, "\n"]
+    if len(queries) == 1:
+        parts.append("User question: ")
+        parts.append(queries[0])
+    else:
+        parts.append("User questions (answer each one, numbered):\n")
+        parts.extend(f"{i}. {q}\n" for i, q in enumerate(queries, 1))
+    return "".join(parts)
+
+class ChatThread(QThread):
+    chat_response = pyqtSignal(str) # Complete, non-streamed messages (e.g. errors)
+    chat_response_delta = pyqtSignal(str) # Incremental text of the response being streamed
+    chat_response_done = pyqtSignal(str) # Full text once the streamed response has finished
+    chat_log = pyqtSignal(dict) 
+
+    def __init__(self, transcript_getter, entities_getter, content_title, external_context):
+        super().__init__()
+        self.chat_queue = queue.SimpleQueue()
+        self.transcript_getter = transcript_getter
+        self.entities_getter = entities_getter # Returns (entities, version); version changes whenever entities do
+        self.content_title = content_title
+        self.external_context = external_context
+
+        # Single source of truth for shutdown
+        self._stop = threading.Event()
+
+        # One client per thread so the underlying HTTP connection is kept alive across queries
+        self._client = ollama.Client(
+            host=OLLAMA_HOST,
+            limits=httpx.Limits(max_keepalive_connections=8, keepalive_expiry=30.0)
+        )
+
+        self._next_keep_alive = 0.0
+        self._last_query = None
+        self._last_query_time = 0.0
+
+        # Serialized cheat sheet, reused until the entities version changes
+        self._cached_entities_json = ""
+        self._cached_version = -1
+
+        self.system_prompt = _render_system_prompt(self.content_title, self.external_context)
+        self._system_msg = {"role": "system", "content": self.system_prompt} # Constant for the thread's lifetime
+
+    def _get_entities_json(self):
+        current_entities, version = self.entities_getter()
+        if version != self._cached_version:
+            self._cached_entities_json = self._summarize_entities(current_entities)
+            self._cached_version = version
+        return self._cached_entities_json
+
+    def _summarize_entities(self, entities):
+        """
+        Serializes the cheat sheet for the chat prompt, keeping only the fields the model needs and
+        adding entities in order of importance until the entity share of the token budget is used up.
+        """
+        budget = int(CHAT_CONTEXT_TOKEN_BUDGET * CHAT_ENTITY_TOKEN_SHARE)
+        ranked = sorted(entities, key=lambda e: -(e.get("base_importance_score", 0) + e.get("mention_count", 0)))
+        items = []
+        used = 0
+        for e in ranked:
+            item = orjson.dumps({"name": e["name"], "type": e["type"], "description": e.get("description", "")}).decode()
+            used += _estimate_tokens(item)
+            if used > budget:
+                break
+            items.append(item)
+        return "[\n" + ",\n".join(items) + "\n]" if items else "[]"
+
+    def _select_recent_transcripts(self, transcripts, budget):
+        """Walks transcripts from newest to oldest and keeps as many as fit in `budget` tokens."""
+        selected = []
+        used = 0
+        for text in reversed(transcripts):
+            used += _estimate_tokens(text)
+            if used > budget and selected:
+                break
+            selected.append(text)
+        selected.reverse()
+        return selected
 
     def add_chat_query(self, query):
+        """Queues a question, or a list of related questions to be answered in a single request."""
+        if isinstance(query, (list, tuple)):
+            query = [q for q in query if q and q.strip()]
+            if not query:
+                return
+        elif not query or not query.strip():
+            return # Accidental empty submissions never reach the model
+
+        # Ignore an identical query repeated within a short interval (e.g. double-clicked send)
+        now = time.monotonic()
+        if query == self._last_query and now - self._last_query_time < DUPLICATE_QUERY_INTERVAL_SECONDS:
+            return
+        self._last_query = query
+        self._last_query_time = now
         self.chat_queue.put(query)
 
+    def _collect_batch(self, query):
+        """
+        Takes every query already queued, then waits up to CHAT_BATCH_WINDOW_SECONDS for further ones, and
+        returns all of them as one list, so simultaneous sub-queries share a single LLM round trip.
+        Returns None on the stop sentinel.
+        """
+        batch = list(query) if isinstance(query, list) else [query]
+        deadline = time.monotonic() + CHAT_BATCH_WINDOW_SECONDS
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                next_query = self.chat_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if next_query is None:
+                return None
+            batch.extend(next_query if isinstance(next_query, list) else [next_query])
+        return batch
+
+    def _keep_model_warm(self):
+        """Loads the model (or refreshes its keep-alive) without generating anything."""
+        try:
+            self._client.generate(model=CHAT_MODEL, prompt="", keep_alive=MODEL_KEEP_ALIVE, options=_CHAT_OPTIONS)
+        except Exception as e:
+            self.chat_log.emit({"type": "warning", "message": f"Chat model keep-alive ping failed: {str(e)}"})
+        self._next_keep_alive = time.monotonic() + MODEL_KEEP_ALIVE_PING_SECONDS
+
     def run(self):
-        self.running = True
-        # ADDED: Clear stop event at the start of run
-        self._stop_event.clear()
+        self._stop.clear()
+        self._keep_model_warm() # Done here rather than in __init__ so the GUI thread never waits on a model load
 
-        while self.running:
+        while not self._stop.is_set():
+            # Blocks without polling until a query, the keep-alive deadline, or the stop sentinel
             try:
-                # Changed to get with timeout to be responsive to stop signals
-                query = self.chat_queue.get(timeout=0.1) 
-                
-                transcripts = self.transcript_getter()
-                recent_transcripts = transcripts[-5:] if len(transcripts) > 5 else transcripts
-                current_entities = self.entities_getter()
-                current_entities_json = json.dumps(current_entities, indent=2)
-
-                messages = [
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content":
-                     f"Transcript history: {recent_transcripts}\n"
-                     f"Current narrative cheat sheet: {current_entities_json}\n"
-                     f"User question: {query}"}
-                ]
-                self.chat_log.emit({"type": "chat_prompt", "message": "Chat prompt sent:", "data": messages})
-                try:
-                    response = ollama.chat(model="llama3.2:latest", messages=messages, stream=False)
-                    content = response['message']['content']
-                    self.chat_response.emit(content)
-                    self.chat_log.emit({"type": "chat_response", "message": "Chat response received.", "data": content})
-                except Exception as e:
-                    self.chat_response.emit(f"Error: Unable to process query - {str(e)}")
-                    self.chat_log.emit({"type": "error", "message": f"Chat Error: {str(e)}"})
+                query = self.chat_queue.get(timeout=max(0.0, self._next_keep_alive - time.monotonic()))
             except queue.Empty:
-                # If queue is empty (no chat query), check if stop event is set
-                if self._stop_event.is_set():
-                    self.chat_log.emit({"type": "status", "message": "Chat Thread received stop signal during idle, exiting."})
-                    break # Exit the loop immediately
-            # REMOVED: original time.sleep(0.5) as get(timeout) handles idle waiting.
-            # If the queue wasn't empty, processing might take time, so no additional sleep is needed.
+                self._keep_model_warm()
+                continue
+            # Everything already queued joins this query's batch; only an answer still being streamed
+            # is superseded by a newer query (see _answer_query)
+            queries = self._collect_batch(query) if query is not None else None
+            if queries is None:
+                break
+            self._answer_query(queries)
+
+        self.chat_log.emit({"type": "status", "message": "Chat Thread received stop signal, exiting."})
+
+    def _answer_query(self, queries):
+        current_entities_json = self._get_entities_json()
+        transcript_budget = CHAT_CONTEXT_TOKEN_BUDGET - _estimate_tokens(current_entities_json)
+        recent_transcripts = self._select_recent_transcripts(self.transcript_getter(), transcript_budget)
+
+        user_content = _build_user_content(recent_transcripts, current_entities_json, queries)
+        messages = [self._system_msg, {"role": "user", "content": user_content}]
+        self.chat_log.emit({"type": "chat_prompt", "message": "Chat prompt sent:", "data": messages})
+        response_parts = []
+        emitted_parts = 0 # response_parts[:emitted_parts] have been sent as chat_response_delta
+        cancelled = False
+        try:
+            stream = self._client.chat(model=CHAT_MODEL, messages=messages, stream=True, keep_alive=MODEL_KEEP_ALIVE, options=_CHAT_OPTIONS)
+            next_emit = time.monotonic() + CHAT_DELTA_EMIT_INTERVAL_SECONDS
+            try:
+                for chunk in stream:
+                    delta = chunk['message']['content']
+                    if delta:
+                        response_parts.append(delta)
+                        # Each emit is a queued event on the GUI thread, so tokens are sent in small batches
+                        if time.monotonic() >= next_emit:
+                            self.chat_response_delta.emit("".join(response_parts[emitted_parts:]))
+                            emitted_parts = len(response_parts)
+                            next_emit = time.monotonic() + CHAT_DELTA_EMIT_INTERVAL_SECONDS
+                    # A newer query (or the stop sentinel) preempts this one: stop generating
+                    if not self.chat_queue.empty() or self._stop.is_set():
+                        cancelled = True
+                        break
+            finally:
+                stream.close() # Closes the HTTP response so the server stops generating
+                if emitted_parts < len(response_parts):
+                    self.chat_response_delta.emit("".join(response_parts[emitted_parts:]))
+                    emitted_parts = len(response_parts)
+            content = "".join(response_parts)
+            self.chat_response_done.emit(content)
+            if cancelled:
+                self.chat_log.emit({"type": "status", "message": "Chat response cancelled by a newer query.", "data": content})
+            else:
+                self.chat_log.emit({"type": "chat_response", "message": "Chat response received.", "data": content})
+        except Exception as e:
+            if response_parts:
+                self.chat_response_done.emit("".join(response_parts)) # Close the partially streamed answer
+            self.chat_response.emit(f"Error: Unable to process query - {str(e)}")
+            self.chat_log.emit({"type": "error", "message": f"Chat Error: {str(e)}"})
 
     def stop(self):
-        self.running = False
-        # ADDED: Set stop event to signal termination
-        self._stop_event.set()
\ No newline at end of file
+        self._stop.set()
+        self.chat_queue.put(None) # Wakes the blocking get() in run()
@@ -1,12 +1,72 @@
+import asyncio
+import functools
 import json
 import re
-import threading
-import time
+import numpy as np
 import ollama
-import Levenshtein # Used for robust string similarity comparison
+import orjson # Faster JSON for prompts and responses; its JSONDecodeError subclasses json.JSONDecodeError
+from rapidfuzz import process as fuzzy_process # Used for robust string similarity comparison
+from rapidfuzz.distance import Indel # Indel.normalized_similarity is the same score as Levenshtein.ratio
 from PyQt5.QtCore import QThread, pyqtSignal
-from constants import TRANSCRIPT_CHUNK_DURATION_SECONDS
-from llm_prompts import base_system_prompt
+from constants import (
+    TRANSCRIPT_CHUNK_DURATION_SECONDS, OLLAMA_HOST, OLLAMA_NUM_CTX, LLM_MAX_PARALLEL_REQUESTS,
+    LLM_MAX_SNIPPETS_PER_REQUEST, LLM_CHEAT_SHEET_MAX_DESCRIPTION_CHARS, LLM_DEBUG_LOGGING
+)
+from llm_prompts import build_system_prompt
+from backend.text_normalization import (
+    MentionMatcher, clean_canonical_candidate, normalize_for_mention, normalize_name,
+    normalize_transcript_for_mention, strip_name, strip_parenthesized
+)
+
+_RE_SENTENCE_END = re.compile(r'(?<=[.!?])\s')
+
+@functools.lru_cache(maxsize=4096)
+def _first_sentence(text):
+    """The first sentence of an entity description; enough for the extractor to disambiguate."""
+    return _RE_SENTENCE_END.split(text.strip(), 1)[0] if text else ""
+
+# Keeps the extraction model loaded between transcripts instead of Ollama's 5 minute default
+LLM_KEEP_ALIVE = "1h"
+LLM_IDLE_RECHECK_SECONDS = 30 # Upper bound on how long an idle thread sleeps without re-checking for work
+
+# num_ctx stays fixed at OLLAMA_NUM_CTX (a per-prompt value would make Ollama reload the model), so
+# prompts are checked against it instead: Ollama silently drops the oldest tokens, system prompt first
+_SIMILARITY_THRESHOLD = 0.88 # Similarity a name must exceed to be merged into an existing entity of its type
+
+_CHARS_PER_TOKEN = 4 # Rough average for English text with Llama tokenizers
+_RESPONSE_TOKEN_RESERVE = 1024 # Room left in the context for the generated entity list
+# Closing line of every extraction request; the full rules live in the system prompt
+_EXTRACTION_INSTRUCTION = ("Using the current transcript, recent context and cheat sheet, return *all* identifiable entities, "
+                           "each with a re-evaluated 'base_importance_score' (1-10) and an 'aliases' array, "
+                           "correctly categorized under canonical names.")
+
+VALID_ENTITY_TYPES = ("Characters", "Locations", "Organizations", "Key Objects", "Concepts/Events")
+
+# Lowercased LLM type strings -> canonical entity type
+_TYPE_ALIAS_MAP = {
+    "concept/event": "Concepts/Events",
+    "locations/organizations": "Locations",
+    "locations/concepts/events": "Locations",
+}
+for _canonical_type, _aliases in (
+    ("Characters", ["characters", "characters/individuals", "character", "individual"]),
+    ("Locations", ["locations", "location", "countries", "country", "cities", "city", "places", "place"]),
+    ("Organizations", ["organizations", "organization", "agencies", "agency", "governments", "government", "corporations", "corporation", "groups", "group", "factions", "faction", "allies", "powers"]),
+    ("Key Objects", ["key objects", "key object", "objects", "object", "artifacts", "artifact", "weapons", "weapon"]),
+    ("Concepts/Events", ["concepts/events", "concepts", "concept", "events", "event", "historical events", "dates", "years", "periods", "period", "projects", "programs", "wars", "conflicts", "eras", "era", "ages", "age", "campaigns", "campaign"]),
+):
+    for _alias in _aliases:
+        _TYPE_ALIAS_MAP.setdefault(_alias, _canonical_type)
+del _canonical_type, _aliases, _alias
+
+@functools.lru_cache(maxsize=256)
+def _canonical_entity_type(type_str):
+    """Maps an LLM type string to a canonical type (or None). The model uses a small vocabulary, so results are cached."""
+    type_str_lower = type_str.lower().strip()
+    # Handle compound types by splitting and taking the first part as a primary hint
+    if ',' in type_str_lower:
+        type_str_lower = type_str_lower.split(',', 1)[0].strip()
+    return _TYPE_ALIAS_MAP.get(type_str_lower)
 
 # Define the JSON schema for the expected entity output format
 entity_list_schema = {
@@ -53,38 +113,133 @@ entity_list_schema = {
     ]
 }
 
+# Schema for one request covering several snippets: one entities array per snippet index
+grouped_entity_list_schema = {
+    "type": "object",
+    "properties": {
+        "snippets": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "index": {
+                        "type": "integer"
+                    },
+                    "entities": entity_list_schema["properties"]["entities"]
+                },
+                "required": [
+                    "index",
+                    "entities"
+                ]
+            }
+        }
+    },
+    "required": [
+        "snippets"
+    ]
+}
+
+
+class _EntityStreamDecoder:
+    """
+    Incrementally pulls complete items out of the "entities" array of a streamed
+    {"entities": [...]} response, so each entity is decoded as soon as its closing brace arrives.
+    """
+    def __init__(self):
+        self.text = ""
+        self.closed = False # True once the entities array's closing bracket has been seen
+        self._pos = -1 # Index just past the last decoded item; -1 until the array opens
+        self._decoder = json.JSONDecoder()
+
+    def feed(self, chunk):
+        """Appends a streamed chunk and returns the entities it completed."""
+        self.text += chunk
+        text = self.text
+        if self._pos < 0:
+            key = text.find('"entities"')
+            start = text.find('[', key) if key >= 0 else -1
+            if start < 0:
+                return []
+            self._pos = start + 1
+
+        entities = []
+        while not self.closed:
+            pos = self._pos
+            while pos < len(text) and text[pos] in ' \t\r\n,':
+                pos += 1
+            if pos >= len(text):
+                break
+            if text[pos] == ']':
+                self.closed = True
+                self._pos = pos + 1
+                break
+            try:
+                item, self._pos = self._decoder.raw_decode(text, pos)
+            except json.JSONDecodeError:
+                break # The item is still being generated
+            entities.append(item)
+        return entities
+
+
 class LLMThread(QThread):
     llm_log = pyqtSignal(dict) 
     entities_updated = pyqtSignal(list)
 
     def __init__(self):
         super().__init__()
+        # Sampling options are identical for every extraction request, so the dict is built once
+        self._chat_options = {
+            "temperature": 0.1, 
+            "top_p": 0.9,       
+            "top_k": 40,        
+            "repeat_penalty": 1.0,
+            "num_ctx": OLLAMA_NUM_CTX,
+            "num_batch": 512
+        }
+        self._client = ollama.Client(host=OLLAMA_HOST)
         try:
             self.model = "llama3.2:latest"
-            # Attempt a simple chat to ensure Ollama is running and model exists
-            ollama.chat(model=self.model, messages=[{"role": "user", "content": "hi"}], stream=False)
+            # Attempt a simple chat to ensure Ollama is running and model exists (this also loads it)
+            self._client.chat(model=self.model, messages=[{"role": "user", "content": "hi"}], stream=False,
+                              keep_alive=LLM_KEEP_ALIVE, options=self._chat_options)
             self.llm_log.emit({"type": "status", "message": f"Successfully connected to Ollama model '{self.model}'."})
         except Exception as e:
             self.llm_log.emit({"type": "error", "message": f"Failed to connect to Ollama or model '{self.model}' not found: {e}"})
             self.model = None
 
         self.transcriptions = []
+        self._loop = None # Event loop of the processing coroutine while it runs
+        self._wakeup = None # asyncio.Event set (thread-safely) on new transcripts, context or stop
         self.entities = [] # This will hold the canonical entities (with combined info)
+        self.entities_version = 0 # Bumped every time a new entities list is published
+        # Parallel per-entity lists for the similarity fallback, rebuilt whenever self.entities is replaced
+        self._similarity_source = None
+        self._similarity_names = []
+        self._similarity_cleaned = []
+        self._similarity_by_type = {}
+        self._similarity_primed = {} # (cleaned name, canonical type) -> best extractOne-style match, or None
+        self._by_canonical = {} # (canonical name, canonical type) -> entity; self.entities is a snapshot of its values
+        self._canonical_names = {} # (entity name, type) -> result of _normalize_for_comparison for that name
+        self._mention_matcher = MentionMatcher(())
+        self._mention_matcher_names = [] # Entity names (the _similarity_names column) the matcher was built from
         self.dynamic_alias_map = {} # Maps alias (normalized string) -> canonical name (actual string from entities list)
         self.running = False
         self.external_context = ""
         self.content_title = "Unknown Content"
 
-        self.base_system_prompt_template = base_system_prompt
-        
         # Initial formatting of the system prompt
-        self.system_prompt = self.base_system_prompt_template.format(
-            content_title=self.content_title,
-            external_context="No external context loaded yet. Please wait for the application to gather information."
+        self.system_prompt = build_system_prompt(
+            self.content_title,
+            "No external context loaded yet. Please wait for the application to gather information."
         )
+        self._cheat_sheet_json_text = "{}" # Serialized cheat sheet for the extraction prompt
+        self._cheat_sheet_dirty = True # Set whenever reconciliation changes what the cheat sheet shows
         self.last_transcript_processed_idx = -1
+        # Debug traces are collected here and sent as one "debug_batch" log per transcript
+        self._debug_enabled = LLM_DEBUG_LOGGING
+        self._debug_messages = []
         
-        self.VALID_ENTITY_TYPES = ["Characters", "Locations", "Organizations", "Key Objects", "Concepts/Events"]
+        self.VALID_ENTITY_TYPES = VALID_ENTITY_TYPES
 
     def set_content_title(self, title):
         self.content_title = title
@@ -93,41 +248,16 @@ class LLMThread(QThread):
     def set_external_context(self, context):
         self.external_context = context
         self._update_system_prompt()
+        self._wake()
 
     def _update_system_prompt(self):
-        self.system_prompt = self.base_system_prompt_template.format(
-            content_title=self.content_title,
-            external_context=self.external_context
-        )
+        self.system_prompt = build_system_prompt(self.content_title, self.external_context)
     
     def _normalize_entity_type(self, type_str):
         """Normalizes LLM output type strings to our canonical types."""
         if not type_str:
             return None
-        type_str_lower = type_str.lower().strip()
-        
-        # Handle compound types by splitting and taking the first part as a primary hint
-        if ',' in type_str_lower:
-            type_str_lower = type_str_lower.split(',')[0].strip()
-        
-        if type_str_lower == "concept/event":
-            return "Concepts/Events"
-        if type_str_lower == "locations/organizations":
-            return "Locations" 
-        if type_str_lower == "locations/concepts/events":
-            return "Locations" 
-        
-        if type_str_lower in ["characters", "characters/individuals", "character", "individual"]:
-            return "Characters"
-        elif type_str_lower in ["locations", "location", "countries", "country", "cities", "city", "places", "place"]:
-            return "Locations"
-        elif type_str_lower in ["organizations", "organization", "agencies", "agency", "governments", "government", "corporations", "corporation", "groups", "group", "factions", "faction", "allies", "powers"]:
-            return "Organizations"
-        elif type_str_lower in ["key objects", "key object", "objects", "object", "artifacts", "artifact", "weapons", "weapon"]:
-            return "Key Objects"
-        elif type_str_lower in ["concepts/events", "concepts", "concept", "events", "event", "historical events", "dates", "years", "periods", "period", "projects", "programs", "wars", "conflicts", "eras", "era", "ages", "age", "campaigns", "campaign"]:
-            return "Concepts/Events"
-        return None
+        return _canonical_entity_type(type_str)
 
     def _normalize_for_comparison(self, name, entity_type=None):
         """
@@ -141,75 +271,129 @@ class LLMThread(QThread):
 
         # Step 1: Basic cleaning for lookup in alias map and similarity comparison
         # Remove parenthesized content for a cleaner base name
-        cleaned_base_name = re.sub(r'\s*\([^)]*\)', '', name).strip()
-        name_lower_stripped = re.sub(r'[^a-z0-9\s]', '', cleaned_base_name.lower()).strip()
-        name_lower_stripped = re.sub(r'\s+', ' ', name_lower_stripped).strip()
+        cleaned_base_name = strip_parenthesized(name)
+        name_lower_stripped = normalize_name(name)
 
         # Step 2: Check dynamic alias map for direct lookup
         if name_lower_stripped in self.dynamic_alias_map:
             # We found a canonical name, return it
             canonical_name = self.dynamic_alias_map[name_lower_stripped]
-            self.llm_log.emit({"type": "debug", "message": f"Alias map hit: '{name}' (cleaned: '{name_lower_stripped}') mapped to '{canonical_name}'."})
+            if self._debug_enabled:
+                self._debug_messages.append(f"Alias map hit: '{name}' (cleaned: '{name_lower_stripped}') mapped to '{canonical_name}'.")
             return canonical_name
 
         # Step 3: If not in alias map, try to find a similar existing canonical entity
         # This acts as a fallback for aliases LLM might miss, or minor transcription errors.
         best_match_canonical_name = None
-        highest_similarity = 0.88 # Threshold for considering a strong match (0.0 to 1.0)
-
-        for existing_entity in self.entities:
-            # Ensure entity type is comparable or ignored if not provided
-            if entity_type is not None and self._normalize_entity_type(existing_entity["type"]) != self._normalize_entity_type(entity_type):
-                continue # Skip if types are known and don't match
-
-            existing_canonical_name_cleaned = re.sub(r'[^a-z0-9\s]', '', existing_entity["name"].lower()).strip()
-            existing_canonical_name_cleaned = re.sub(r'\s+', ' ', existing_canonical_name_cleaned).strip()
-            
-            # Use Levenshtein distance ratio for similarity
-            similarity = Levenshtein.ratio(name_lower_stripped, existing_canonical_name_cleaned)
-            
-            if similarity > highest_similarity:
-                highest_similarity = similarity
-                best_match_canonical_name = existing_entity["name"] # Keep the actual canonical name from our entity list
+        similarity_threshold = _SIMILARITY_THRESHOLD # Threshold for considering a strong match (0.0 to 1.0)
+
+        if self._similarity_source is not self.entities:
+            self._refresh_similarity_index()
+        # Ensure entity type is comparable or ignored if not provided: only that type's bucket is scored
+        if entity_type is None:
+            names, cleaned_names = self._similarity_names, self._similarity_cleaned
+            primed_key = None
+        else:
+            canonical_type = self._normalize_entity_type(entity_type)
+            names, cleaned_names = self._similarity_by_type.get(canonical_type, ((), ()))
+            primed_key = (name_lower_stripped, canonical_type)
+
+        if primed_key in self._similarity_primed:
+            match = self._similarity_primed[primed_key] # Scored in bulk by _prime_similarity
+        else:
+            # One C++ call scores every candidate and stops early on candidates that cannot beat the cutoff
+            match = fuzzy_process.extractOne(
+                name_lower_stripped,
+                cleaned_names,
+                scorer=Indel.normalized_similarity,
+                score_cutoff=similarity_threshold
+            )
+        if match is not None and match[1] > similarity_threshold:
+            highest_similarity = match[1]
+            best_match_canonical_name = names[match[2]] # Keep the actual canonical name from our entity list
 
         if best_match_canonical_name:
             # If a strong similarity match is found, add the current name as an alias
             # to the best_match_canonical_name for future faster lookups.
             self.dynamic_alias_map[name_lower_stripped] = best_match_canonical_name
-            self.llm_log.emit({"type": "debug", "message": f"Similarity match: '{name}' (cleaned: '{name_lower_stripped}') strongly similar to '{best_match_canonical_name}' (similarity: {highest_similarity:.2f}). Added to alias map."})
+            if self._debug_enabled:
+                self._debug_messages.append(f"Similarity match: '{name}' (cleaned: '{name_lower_stripped}') strongly similar to '{best_match_canonical_name}' (similarity: {highest_similarity:.2f}). Added to alias map.")
             return best_match_canonical_name
         
         # Step 4: No direct alias or strong similarity match found.
         # This is a new potential canonical entity name. Apply more aggressive cleaning.
         # This cleaning is done *after* alias/similarity check to preserve LLM's raw name if it's the canonical one.
-        final_canonical_candidate = cleaned_base_name # Start with the name without parenthesized text
-
-        # Remove common articles and possessive endings for robust canonicalization
-        for article in ['the ', 'a ', 'an ']:
-            if final_canonical_candidate.lower().startswith(article):
-                final_canonical_candidate = final_canonical_candidate[len(article):].strip()
-        final_canonical_candidate = re.sub(r"'s?\b", '', final_canonical_candidate, flags=re.IGNORECASE).strip() # remove 's or s' at end of word
-        final_canonical_candidate = re.sub(r'[^a-zA-Z0-9\s]', '', final_canonical_candidate).strip() # remove non-alphanumeric (keep spaces)
-        final_canonical_candidate = re.sub(r'\s+', ' ', final_canonical_candidate).strip() # reduce multiple spaces
+        final_canonical_candidate = clean_canonical_candidate(cleaned_base_name) # Start with the name without parenthesized text
 
         if not final_canonical_candidate: # If cleaning resulted in empty string, use original
             final_canonical_candidate = name.strip()
             
         # Add this new canonical candidate to the alias map, pointing to itself
         self.dynamic_alias_map[final_canonical_candidate.lower()] = final_canonical_candidate
-        self.llm_log.emit({"type": "debug", "message": f"New canonical candidate: '{name}' mapped to cleaned '{final_canonical_candidate}'. Added to alias map."})
+        if self._debug_enabled:
+            self._debug_messages.append(f"New canonical candidate: '{name}' mapped to cleaned '{final_canonical_candidate}'. Added to alias map.")
         return final_canonical_candidate
 
+    def _refresh_similarity_index(self):
+        """
+        Snapshots each entity's display name and cleaned name into parallel lists, overall and bucketed
+        by canonical type, so similarity lookups don't re-clean or re-normalize every entity on every call.
+        The names column also keys the mention matcher.
+        """
+        self._similarity_source = self.entities
+        self._similarity_names = [e["name"] for e in self.entities]
+        self._similarity_cleaned = [strip_name(name) for name in self._similarity_names]
+        self._similarity_by_type = {} # Canonical type -> (names, cleaned names) of that type only
+        self._similarity_primed = {} # Scores against the previous snapshot are stale
+        for name, cleaned, e in zip(self._similarity_names, self._similarity_cleaned, self.entities):
+            bucket = self._similarity_by_type.setdefault(self._normalize_entity_type(e["type"]), ([], []))
+            bucket[0].append(name)
+            bucket[1].append(cleaned)
+
+    def _prime_similarity(self, names_and_types):
+        """
+        Scores every (name, canonical type) that will reach the similarity fallback against its type's
+        bucket with one rapidfuzz cdist call per type, instead of one extractOne call per name.
+        The results stay valid until self.entities is replaced, i.e. for the rest of the round.
+        """
+        if self._similarity_source is not self.entities:
+            self._refresh_similarity_index()
+        queries_by_type = {}
+        for name, canonical_type in names_and_types:
+            cleaned = normalize_name(name)
+            if cleaned and cleaned not in self.dynamic_alias_map and (cleaned, canonical_type) not in self._similarity_primed:
+                queries_by_type.setdefault(canonical_type, {})[cleaned] = None
+        for canonical_type, queries in queries_by_type.items():
+            _, cleaned_names = self._similarity_by_type.get(canonical_type, ((), ()))
+            queries = list(queries)
+            if not cleaned_names:
+                # Nothing to match against; the fallback cleaning handles these names
+                self._similarity_primed.update(dict.fromkeys([(query, canonical_type) for query in queries]))
+                continue
+            # float64 so the strict "> threshold" test sees the same score extractOne would return
+            scores = fuzzy_process.cdist(queries, cleaned_names, scorer=Indel.normalized_similarity,
+                                         score_cutoff=_SIMILARITY_THRESHOLD, dtype=np.float64)
+            best = scores.argmax(axis=1) # First best choice on ties, like extractOne
+            for query, row, col in zip(queries, scores, best):
+                score = row[col]
+                # cdist reports scores under the cutoff as 0
+                self._similarity_primed[(query, canonical_type)] = (cleaned_names[col], score, int(col)) if score else None
+
+    def _canonical_name_of(self, entity):
+        """_normalize_for_comparison of an existing entity's own name, computed once per name/type."""
+        key = (entity["name"], entity["type"])
+        canonical_name = self._canonical_names.get(key)
+        if canonical_name is None:
+            canonical_name = self._normalize_for_comparison(entity["name"], entity["type"])
+            self._canonical_names[key] = canonical_name
+        return canonical_name
+
     def _normalize_for_mention_check(self, text):
         """
         More aggressive normalization for checking mentions in raw text.
         Converts to lowercase, removes most punctuation, handles common plural/possessive endings.
         """
-        text = text.lower()
-        text = re.sub(r"['’]\s*s?\b", '', text) # Handles 's and s' (e.g., 'character's' or 'characters')
-        text = re.sub(r'[^a-z0-9\s]', ' ', text) # Replace non-alphanumeric with space
-        text = re.sub(r'\s+', ' ', text).strip() # Reduce multiple spaces to single space
-        return text
+        return normalize_for_mention(text)
 
     # _is_similar_entity is removed as its logic is now primarily handled by _normalize_for_comparison
     # during entity reconciliation for deduplication.
@@ -219,20 +403,22 @@ class LLMThread(QThread):
         Increments mention_count for existing entities found in the new transcript.
         Uses canonical names for matching to handle variations/typos.
         """
-        normalized_transcript_for_check = self._normalize_for_mention_check(transcript_text)
-        
-        for entity in self.entities:
-            # Get the canonical name of the *existing* entity for matching
-            # Ensure it's in the form used for mention checking.
-            entity_canonical_name_for_check = self._normalize_for_mention_check(entity["name"]) 
-            
-            # Prepare a regex pattern for the canonical name, ensuring whole word match
-            # re.escape is important if entity name contains special regex characters
-            pattern = r'\b' + re.escape(entity_canonical_name_for_check) + r'\b'
-            
-            if re.search(pattern, normalized_transcript_for_check):
-                entity["mention_count"] += 1
-                self.llm_log.emit({"type": "debug", "message": f"Entity '{entity['name']}' (canonical: '{entity_canonical_name_for_check}') ({entity['type']}) mention_count incremented to {entity['mention_count']}"})
+        # The matcher only depends on the entity names, so it is rebuilt only when those change.
+        # The names column is the same per-round snapshot the similarity lookups use.
+        if self._similarity_source is not self.entities:
+            self._refresh_similarity_index()
+        names = self._similarity_names
+        if names != self._mention_matcher_names:
+            self._mention_matcher = MentionMatcher(names)
+            self._mention_matcher_names = names
+
+        # Only the mentioned entities are visited, not the whole list
+        entities = self.entities
+        for i in self._mention_matcher.mentioned_positions(transcript_text):
+            entity = entities[i]
+            entity["mention_count"] += 1
+            if self._debug_enabled:
+                self._debug_messages.append(f"Entity '{entity['name']}' ({entity['type']}) mention_count incremented to {entity['mention_count']}")
 
     def run(self):
         self.running = True
@@ -240,240 +426,363 @@ class LLMThread(QThread):
             self.llm_log.emit({"type": "error", "message": "LLM model not loaded, cannot process entities."})
             self.running = False
             return
+        try:
+            asyncio.run(self._main())
+        finally:
+            self._loop = None
 
+    async def _main(self):
+        self._wakeup = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
         if not self.external_context:
             self.llm_log.emit({"type": "status", "message": "LLM Thread waiting for external context..."})
             while self.running and not self.external_context:
-                time.sleep(1)
+                await self._wait_for_wakeup()
             if not self.running:
                 return
 
         self.llm_log.emit({"type": "status", "message": "LLM Thread started with external context."})
+        client = ollama.AsyncClient(host=OLLAMA_HOST) # One connection pool for every request of this run
         while self.running:
-            if len(self.transcriptions) > self.last_transcript_processed_idx + 1:
-                transcript_to_process = self.transcriptions[self.last_transcript_processed_idx + 1] 
-                current_transcript_idx = self.last_transcript_processed_idx + 1 
-                
-                recent_transcripts = self.transcriptions[max(0, current_transcript_idx - 4):current_transcript_idx + 1]
-                
-                current_entities_for_llm_prompt = [
-                    {"name": e["name"], "type": e["type"], "description": e["description"]}
-                    for e in self.entities
-                ]
-
-                # Combine current and recent transcripts for a robust mention check later
-                all_relevant_transcript_text = "\n".join(recent_transcripts)
-                normalized_all_relevant_transcript_text = self._normalize_for_mention_check(all_relevant_transcript_text)
+            # Fan out every pending transcript (up to the server's parallelism) in one round
+            groups = self._pending_groups()
+            if groups:
+                # Every request of the round is built from the same cheat sheet, taken before any of it is reconciled
+                cheat_sheet = self._cheat_sheet_json()
+                tasks = [asyncio.create_task(self._request_group(client, group, cheat_sheet)) for group in groups]
+                try:
+                    # Reconcile each transcript, in order, as soon as its response is in; the CPU work
+                    # overlaps with the later requests that are still being generated
+                    for group, task in zip(groups, tasks):
+                        entities_per_snippet = await task
+                        if not self.running:
+                            return
+                        for idx, llm_identified_entities in zip(group, entities_per_snippet):
+                            self._reconcile_entities(idx, llm_identified_entities)
+                finally:
+                    for task in tasks:
+                        task.cancel()
+            else:
+                await self._wait_for_wakeup()
+
+    def _pending_groups(self):
+        """
+        Splits the pending transcripts into at most LLM_MAX_PARALLEL_REQUESTS runs of consecutive
+        indices. Each transcript gets its own request until the queue is deeper than that; a backlog
+        is spread over the requests, up to LLM_MAX_SNIPPETS_PER_REQUEST snippets each.
+        """
+        first_idx = self.last_transcript_processed_idx + 1
+        pending = min(len(self.transcriptions) - first_idx, LLM_MAX_PARALLEL_REQUESTS * LLM_MAX_SNIPPETS_PER_REQUEST)
+        if pending <= 0:
+            return []
+        group_size = -(-pending // LLM_MAX_PARALLEL_REQUESTS) # Ceiling division
+        return [range(start, min(start + group_size, first_idx + pending))
+                for start in range(first_idx, first_idx + pending, group_size)]
+
+    def _request_group(self, client, group, cheat_sheet):
+        """Starts the request for one group, with the round's serialized cheat sheet."""
+        if len(group) == 1:
+            return self._request_single(client, group[0], self._build_messages(group[0], cheat_sheet))
+        return self._request_grouped_entities(client, group, self._build_grouped_messages(group, cheat_sheet))
+
+    async def _request_single(self, client, idx, messages):
+        return [await self._request_entities(client, idx, messages)]
+
+    async def _wait_for_wakeup(self):
+        try:
+            # The timeout is only a safety net against a lost wake-up; callers re-check their condition
+            await asyncio.wait_for(self._wakeup.wait(), LLM_IDLE_RECHECK_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear() # Coalesced wake-ups are harmless for the same reason
+
+    def _wake(self):
+        """Wakes the processing coroutine from any thread. A no-op while it is not running."""
+        loop = self._loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                pass # The loop closed in the meantime
+
+    def _cheat_sheet_json(self):
+        """
+        The cheat sheet as compact JSON, {type: {name: first sentence of its description}}. Extraction
+        requests are stateless, so every prompt carries the whole sheet. Descriptions are included newest
+        entity first up to LLM_CHEAT_SHEET_MAX_DESCRIPTION_CHARS; older entities past that keep only their name.
+        Only rebuilt after reconciliation has touched the entities.
+        """
+        if self._cheat_sheet_dirty:
+            budget = LLM_CHEAT_SHEET_MAX_DESCRIPTION_CHARS
+            summaries = [""] * len(self.entities)
+            for i in range(len(self.entities) - 1, -1, -1):
+                summary = _first_sentence(self.entities[i]["description"])
+                if len(summary) > budget:
+                    break
+                budget -= len(summary)
+                summaries[i] = summary
+            cheat_sheet = {}
+            for e, summary in zip(self.entities, summaries):
+                cheat_sheet.setdefault(e["type"], {})[e["name"]] = summary
+            self._cheat_sheet_json_text = orjson.dumps(cheat_sheet).decode()
+            self._cheat_sheet_dirty = False
+        return self._cheat_sheet_json_text
+
+    def _build_messages(self, current_transcript_idx, cheat_sheet):
+        transcript_to_process = self.transcriptions[current_transcript_idx]
+        recent_transcripts = self.transcriptions[max(0, current_transcript_idx - 4):current_transcript_idx + 1]
+
+        previous_transcripts = recent_transcripts[:-1] # The current snippet is sent on its own line
+        recent_context = "\n---\n".join(previous_transcripts) if previous_transcripts else "(none)"
+
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content":
+                 f"Current transcript snippet: {transcript_to_process}\n"
+                 f"Recent context (previous {len(previous_transcripts)} snippets):\n{recent_context}\n"
+                 f"Current narrative cheat sheet (type -> name -> description): {cheat_sheet}\n"
+                 + _EXTRACTION_INSTRUCTION}
+        ]
+        self.llm_log.emit({"type": "prompt", "message": f"Prompt for transcript index {current_transcript_idx}", "data": messages})
+        self._check_prompt_budget(messages)
+        return messages
+
+    def _build_grouped_messages(self, indices, cheat_sheet):
+        """Like _build_messages, but asks for one entities array per snippet of a backlog."""
+        first_idx = indices[0]
+        previous_transcripts = self.transcriptions[max(0, first_idx - 4):first_idx]
+        recent_context = "\n---\n".join(previous_transcripts) if previous_transcripts else "(none)"
+        snippets = "\n".join(f"Snippet {idx}: {self.transcriptions[idx]}" for idx in indices)
+
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content":
+                 f"Current transcript snippets, in order:\n{snippets}\n"
+                 f"Recent context (previous {len(previous_transcripts)} snippets):\n{recent_context}\n"
+                 f"Current narrative cheat sheet (type -> name -> description): {cheat_sheet}\n"
+                 "Treat each numbered snippet as the current snippet in turn, with the snippets before it as additional recent context. Return one object per snippet in 'snippets', each with that snippet's 'index' and its own 'entities' array, following the same rules as for a single snippet. " + _EXTRACTION_INSTRUCTION}
+        ]
+        self.llm_log.emit({"type": "prompt", "message": f"Prompt for transcript indices {indices[0]}-{indices[-1]}", "data": messages})
+        self._check_prompt_budget(messages)
+        return messages
+
+    def _check_prompt_budget(self, messages):
+        """Warns when a prompt probably won't fit in num_ctx next to the response."""
+        estimated_tokens = sum(len(message["content"]) for message in messages) // _CHARS_PER_TOKEN
+        if estimated_tokens > OLLAMA_NUM_CTX - _RESPONSE_TOKEN_RESERVE:
+            self.llm_log.emit({"type": "warning", "message": f"Prompt is ~{estimated_tokens} tokens, close to or over num_ctx={OLLAMA_NUM_CTX}; Ollama will truncate its start (including the system prompt)."})
+
+    async def _request_entities(self, client, current_transcript_idx, messages):
+        """Sends one extraction request and returns the parsed entity list ([] on any failure)."""
+        decoder = _EntityStreamDecoder()
+        try:
+            stream = await client.chat(
+                model=self.model,
+                messages=messages,
+                stream=True,
+                format=entity_list_schema, 
+                keep_alive=LLM_KEEP_ALIVE,
+                options=self._chat_options
+            )
+            # Entities are decoded while the rest of the response is still being generated
+            llm_identified_entities = []
+            try:
+                async for chunk in stream:
+                    llm_identified_entities.extend(decoder.feed(chunk['message']['content']))
+                    if decoder.closed:
+                        # Everything after the array is the closing brace and, in JSON mode, often a run of
+                        # whitespace up to num_predict; closing the stream makes Ollama stop generating it
+                        break
+            finally:
+                await stream.aclose()
+            raw_content_from_llm = decoder.text
+            self.llm_log.emit({"type": "raw_response", "message": f"Raw LLM response for transcript index {current_transcript_idx}", "data": raw_content_from_llm})
+            if not decoder.closed:
+                # format=entity_list_schema only lets the model emit schema-shaped JSON, so an unclosed array
+                # means the response was cut short (e.g. num_predict); the entities decoded so far are complete
+                self.llm_log.emit({"type": "warning", "message": f"LLM response for transcript index {current_transcript_idx} ended before the entities array closed; keeping {len(llm_identified_entities)} complete entities.", "data": raw_content_from_llm})
+            self.llm_log.emit({"type": "parsed_entities", "message": f"Parsed entities from LLM for transcript index {current_transcript_idx}", "data": llm_identified_entities})
+            return llm_identified_entities
+        except Exception as e:
+            self.llm_log.emit({"type": "error", "message": f"LLM request failed: {str(e)}"})
+        return []
 
+    async def _request_grouped_entities(self, client, indices, messages):
+        """Sends one request for several snippets and returns an entity list per index ([] where missing)."""
+        raw_content_from_llm = ""
+        try:
+            response = await client.chat(
+                model=self.model,
+                messages=messages,
+                format=grouped_entity_list_schema,
+                keep_alive=LLM_KEEP_ALIVE,
+                options=self._chat_options
+            )
+            raw_content_from_llm = response['message']['content']
+            self.llm_log.emit({"type": "raw_response", "message": f"Raw LLM response for transcript indices {indices[0]}-{indices[-1]}", "data": raw_content_from_llm})
+            # format=grouped_entity_list_schema guarantees the shape, so the reply is parsed as-is
+            entities_by_index = {}
+            for snippet in orjson.loads(raw_content_from_llm)['snippets']:
+                entities_by_index.setdefault(snippet['index'], []).extend(snippet['entities'])
+            results = []
+            for idx in indices:
+                llm_identified_entities = entities_by_index.get(idx, [])
+                self.llm_log.emit({"type": "parsed_entities", "message": f"Parsed entities from LLM for transcript index {idx}", "data": llm_identified_entities})
+                results.append(llm_identified_entities)
+            return results
+        except json.JSONDecodeError as e: # orjson.JSONDecodeError is a subclass
+            self.llm_log.emit({"type": "error", "message": f"JSON parsing error: {str(e)}\nAttempted to parse:\n{raw_content_from_llm}", "data": raw_content_from_llm})
+        except Exception as e:
+            self.llm_log.emit({"type": "error", "message": f"LLM request failed: {str(e)}"})
+        return [[] for _ in indices]
+
+    def _reconcile_entities(self, current_transcript_idx, llm_identified_entities):
+        """Merges one transcript's LLM entities into the canonical list and publishes the result."""
+        transcript_to_process = self.transcriptions[current_transcript_idx]
+        recent_transcripts = self.transcriptions[max(0, current_transcript_idx - 4):current_transcript_idx + 1]
+
+        # Combine current and recent transcripts for a robust mention check; each snippet's
+        # normalized form is cached, so only the newest one is actually processed
+        normalized_all_relevant_transcript_text = ' '.join(filter(None, map(normalize_transcript_for_mention, recent_transcripts)))
+
+        # --- Entity Reconciliation and Update ---
+        # Entities are keyed by (canonical name, canonical type) to ensure uniqueness
+        entities_by_key = self._by_canonical
+
+        candidate_entities = []
+        for llm_entity_data in llm_identified_entities:
+            name = llm_entity_data.get("name")
+            raw_type = llm_entity_data.get("type")
+            
+            if not name:
+                self.llm_log.emit({"type": "warning", "message": f"Skipping invalid entity from LLM (missing name).", "entity_data": llm_entity_data})
+                continue
+
+            canonical_type = self._normalize_entity_type(raw_type)
+            if canonical_type is None:
+                self.llm_log.emit({"type": "warning", "message": f"Skipping entity with unrecognized type '{raw_type}'.", "entity_data": llm_entity_data})
+                continue
+
+            # The LLM name and its aliases in mention-check form; empty results can never match
+            mention_keys = [key for key in map(self._normalize_for_mention_check, [name, *llm_entity_data.get("aliases", [])]) if key]
+            candidate_entities.append((llm_entity_data, name, canonical_type, mention_keys))
+
+        # New strict mention filter:
+        # Check if the LLM-provided name (or any alias it gave) is in the transcript text.
+        # A substring test on the normalized text: it already accepts every whole-word mention, so a
+        # word-level pass in front of it could never change the outcome.
+        filtered_llm_identified_entities = []
+        for llm_entity_data, name, canonical_type, mention_keys in candidate_entities:
+            mention_found = any(key in normalized_all_relevant_transcript_text for key in mention_keys)
+            if not mention_found:
+                self.llm_log.emit({"type": "warning", "message": f"LLM proposed entity '{name}' ({llm_entity_data.get('type')}) not found explicitly in transcript or its aliases. Skipping.", "entity_data": llm_entity_data})
+                continue # Skip this entity if not actually mentioned
+            
+            filtered_llm_identified_entities.append((llm_entity_data, name, canonical_type))
+
+        # Canonicalize every distinct (name, type) once up front; the LLM often repeats an entity
+        canonical_names = {}
+        self._prime_similarity({(name, canonical_type) for _, name, canonical_type in filtered_llm_identified_entities})
+        for _, name, canonical_type in filtered_llm_identified_entities:
+            if (name, canonical_type) not in canonical_names:
+                # IMPORTANT: Use the _normalize_for_comparison method here for the LLM's primary name
+                canonical_names[(name, canonical_type)] = self._normalize_for_comparison(name, canonical_type)
+
+        # Process only the entities that were actually mentioned in the transcript
+        for llm_entity_data, name, canonical_type in filtered_llm_identified_entities:
+            description = llm_entity_data.get("description")
+            base_importance_score = llm_entity_data.get("base_importance_score")
+            aliases = llm_entity_data.get("aliases", []) 
+            
+            if not isinstance(base_importance_score, int) or not (1 <= base_importance_score <= 10):
+                self.llm_log.emit({"type": "warning", "message": f"Invalid base_importance_score for '{name}'. Defaulting to 1.", "entity_data": llm_entity_data})
+                base_importance_score = 1
 
-                messages = [
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content":
-                     f"Current transcript snippet: {transcript_to_process}\n"
-                     f"Recent context (last {len(recent_transcripts)} snippets): {recent_transcripts}\n"
-                     f"Current narrative cheat sheet: {json.dumps(current_entities_for_llm_prompt, indent=2)}\n"
-                     f"Based on ALL information (current transcript, recent context, full cheat sheet), identify *all identifiable* entities. For EVERY entity you return (new or existing), provide its 'base_importance_score' (1-10) re-evaluated based on its inherent narrative relevance. Also, include an 'aliases' array for any recognized alternative names, nicknames, or common variations. Remember to include historical dates/years and specific organizations if mentioned. Ensure to correctly categorize and canonicalize names."}
-                ]
-                self.llm_log.emit({"type": "prompt", "message": f"Prompt for transcript index {current_transcript_idx}", "data": messages})
-                
-                llm_identified_entities = []
-                raw_content_from_llm = ""
-                try:
-                    response = ollama.chat(
-                        model=self.model,
-                        messages=messages,
-                        stream=False,
-                        format=entity_list_schema, 
-                        options={
-                            "temperature": 0.1, 
-                            "top_p": 0.9,       
-                            "top_k": 40,        
-                            "repeat_penalty": 1.0 
-                        }
-                    )
-                    raw_content_from_llm = response['message']['content']
-                    self.llm_log.emit({"type": "raw_response", "message": f"Raw LLM response for transcript index {current_transcript_idx}", "data": raw_content_from_llm})
-
-                    # --- Robust JSON Parsing ---
-                    parsed_llm_output = None
-                    json_string_to_parse = ""
-
-                    try:
-                        json_string_to_parse = raw_content_from_llm.strip()
-                        parsed_llm_output = json.loads(json_string_to_parse)
-                    except json.JSONDecodeError:
-                        json_match = re.search(r"```json\s*(.*?)\s*```", raw_content_from_llm, re.DOTALL)
-                        if json_match:
-                            json_string_to_parse = json_match.group(1).strip()
-                            parsed_llm_output = json.loads(json_string_to_parse)
-                        else:
-                            json_match_loose = re.search(r"\{.*\}", raw_content_from_llm, re.DOTALL)
-                            if json_match_loose:
-                                json_string_to_parse = json_match_loose.group(0).strip()
-                                parsed_llm_output = json.loads(json_string_to_parse)
-                            else:
-                                json_match_array_loose = re.search(r"\[.*\]", raw_content_from_llm, re.DOTALL)
-                                if json_match_array_loose:
-                                    json_string_to_parse = json_match_array_loose.group(0).strip()
-                                    parsed_llm_output = json.loads(json_string_to_parse)
-                                else:
-                                    raise json.JSONDecodeError("No recognizable JSON structure found.", raw_content_from_llm, 0)
-
-                    if parsed_llm_output is None:
-                        self.llm_log.emit({"type": "warning", "message": f"JSON parsing attempts found no valid structure.\nAttempted to parse:\n{raw_content_from_llm}", "data": raw_content_from_llm})
-                        llm_identified_entities = [] 
-                    elif isinstance(parsed_llm_output, list):
-                        llm_identified_entities = parsed_llm_output
-                    elif isinstance(parsed_llm_output, dict) and 'entities' in parsed_llm_output:
-                        llm_identified_entities = parsed_llm_output.get('entities', [])
-                    else:
-                        raise ValueError(f"Unexpected JSON structure after parsing: {type(parsed_llm_output)} - {json_string_to_parse}")
-
-                    if not isinstance(llm_identified_entities, list):
-                        raise ValueError("Expected 'entities' to be a list after parsing.")
-                            
-                    self.llm_log.emit({"type": "parsed_entities", "message": f"Parsed entities from LLM for transcript index {current_transcript_idx}", "data": llm_identified_entities})
-
-                except (json.JSONDecodeError, ValueError) as e:
-                    self.llm_log.emit({"type": "error", "message": f"JSON parsing error: {str(e)}\nAttempted to parse:\n{json_string_to_parse if json_string_to_parse else raw_content_from_llm}", "data": raw_content_from_llm})
-                    llm_identified_entities = []
-                except Exception as e:
-                    self.llm_log.emit({"type": "error", "message": f"LLM request failed: {str(e)}"})
-                    llm_identified_entities = [] 
-
-                # --- Entity Reconciliation and Update ---
-                temp_entities_dict = {}
-                for e in self.entities:
-                    # Key by canonical name and canonical type to ensure uniqueness
-                    normalized_name_key = self._normalize_for_comparison(e["name"], e["type"])
-                    canonical_type = self._normalize_entity_type(e["type"]) # Ensure type is canonical too
-                    temp_entities_dict[(normalized_name_key, canonical_type)] = e
-
-                filtered_llm_identified_entities = []
-                for llm_entity_data in llm_identified_entities:
-                    name = llm_entity_data.get("name")
-                    raw_type = llm_entity_data.get("type")
-                    
-                    if not name:
-                        self.llm_log.emit({"type": "warning", "message": f"Skipping invalid entity from LLM (missing name).", "entity_data": llm_entity_data})
-                        continue
-
-                    canonical_type = self._normalize_entity_type(raw_type)
-                    if canonical_type is None:
-                        self.llm_log.emit({"type": "warning", "message": f"Skipping entity with unrecognized type '{raw_type}'.", "entity_data": llm_entity_data})
-                        continue
-                    
-                    # New strict mention filter:
-                    # Check if the LLM-provided name (or its normalized form) is in the transcript text
-                    # We check both the raw name and the more aggressively normalized name
-                    mention_found = False
-                    
-                    # Check raw LLM name directly (case-insensitive, basic cleaning)
-                    # This targets the actual string mentioned by the LLM
-                    normalized_llm_name = self._normalize_for_mention_check(name)
-                    if normalized_llm_name and normalized_llm_name in normalized_all_relevant_transcript_text:
-                        mention_found = True
-                    else:
-                        # Also check any aliases provided by the LLM for mention
-                        for alias in llm_entity_data.get("aliases", []):
-                            normalized_alias = self._normalize_for_mention_check(alias)
-                            if normalized_alias and normalized_alias in normalized_all_relevant_transcript_text:
-                                mention_found = True
-                                break # Found a mention via an alias, no need to check further aliases for THIS entity
-                            
-                    if not mention_found:
-                        self.llm_log.emit({"type": "warning", "message": f"LLM proposed entity '{name}' ({raw_type}) not found explicitly in transcript or its aliases. Skipping.", "entity_data": llm_entity_data})
-                        continue # Skip this entity if not actually mentioned
-                    
-                    filtered_llm_identified_entities.append(llm_entity_data)
-
-                # Process only the entities that were actually mentioned in the transcript
-                for llm_entity_data in filtered_llm_identified_entities:
-                    name = llm_entity_data.get("name")
-                    raw_type = llm_entity_data.get("type")
-                    description = llm_entity_data.get("description")
-                    base_importance_score = llm_entity_data.get("base_importance_score")
-                    aliases = llm_entity_data.get("aliases", []) 
-
-                    canonical_type = self._normalize_entity_type(raw_type) # Already checked above, but keep for clarity
-                    
-                    if not isinstance(base_importance_score, int) or not (1 <= base_importance_score <= 10):
-                        self.llm_log.emit({"type": "warning", "message": f"Invalid base_importance_score for '{name}'. Defaulting to 1.", "entity_data": llm_entity_data})
-                        base_importance_score = 1
-
-                    # Get the canonical name for the LLM-provided name
-                    # IMPORTANT: Use the _normalize_for_comparison method here for the LLM's primary name
-                    llm_provided_canonical_name = self._normalize_for_comparison(name, canonical_type)
-                    
-                    # Use this canonical name and type as the key for lookup in our temp dict
-                    entity_key = (llm_provided_canonical_name, canonical_type)
-                    existing_entity = temp_entities_dict.get(entity_key)
-
-                    if existing_entity:
-                        # Update existing entity
-                        # Prioritize update if new name is more complete or has better casing
-                        # Only update if the normalized names are the same (already guaranteed by entity_key)
-                        current_normalized_name = self._normalize_for_comparison(existing_entity["name"], existing_entity["type"])
-                        new_normalized_name = self._normalize_for_comparison(name, canonical_type)
-
-                        if current_normalized_name == new_normalized_name:
-                            # Heuristic: Prefer longer name (more complete) or better casing
-                            if len(name) > len(existing_entity["name"]) or \
-                               (name and name[0].isupper() and not (existing_entity["name"] and existing_entity["name"][0].isupper())):
-                                existing_entity["name"] = name # Update to the better raw name
-                        
-                        existing_entity["description"] = description if description else existing_entity["description"]
-                        existing_entity["base_importance_score"] = max(existing_entity["base_importance_score"], base_importance_score) # Take max score
-
-                        # Add all provided aliases to the dynamic alias map for the existing entity's canonical name
-                        # Ensure the existing canonical name itself is mapped to its cleaned form
-                        # This ensures the canonical name always maps to itself in its cleaned form
-                        self.dynamic_alias_map[self._normalize_for_comparison(existing_entity["name"], existing_entity["type"]).lower()] = existing_entity["name"]
-                        for alias_name in aliases:
-                            alias_lower = self._normalize_for_comparison(alias_name, canonical_type).lower() # Normalize alias string as well
-                            # Add alias to map IF it's not already pointing to a different canonical entity
-                            # This prevents "Apple" (fruit) mapping to "Apple" (company) if both exist.
-                            if alias_lower not in self.dynamic_alias_map or \
-                               self.dynamic_alias_map[alias_lower] == existing_entity["name"]:
-                                self.dynamic_alias_map[alias_lower] = existing_entity["name"]
-                                self.llm_log.emit({"type": "debug", "message": f"Added alias '{alias_name}' (norm: '{alias_lower}') for existing entity '{existing_entity['name']}'"})
-
-                    else:
-                        # Add new entity
-                        new_entity_canonical_name = self._normalize_for_comparison(name, canonical_type) # Already computed
-                        new_entity = {
-                            "name": new_entity_canonical_name, # Use the derived canonical name for the new entity
-                            "type": canonical_type,
-                            "description": description if description else "",
-                            "base_importance_score": base_importance_score,
-                            "mention_count": 0, # Initialize to 0, will be updated by _update_importance_from_transcript later (if also mentioned in current transcript)
-                            "first_mentioned_idx": current_transcript_idx
-                        }
-                        temp_entities_dict[entity_key] = new_entity
-
-                        # Add current name and all its aliases to the dynamic alias map
-                        self.dynamic_alias_map[new_entity_canonical_name.lower()] = new_entity_canonical_name
-                        for alias_name in aliases:
-                            alias_lower = self._normalize_for_comparison(alias_name, canonical_type).lower() # Normalize alias string as well
-                            if alias_lower not in self.dynamic_alias_map or \
-                               self.dynamic_alias_map[alias_lower] == new_entity_canonical_name: # Check to avoid overwriting
-                                self.dynamic_alias_map[alias_lower] = new_entity_canonical_name
-                                self.llm_log.emit({"type": "debug", "message": f"Added alias '{alias_name}' (norm: '{alias_lower}') for new entity '{new_entity_canonical_name}'"})
-
-                self.entities = list(temp_entities_dict.values())
-                # Now that the entities list is updated, trigger mention count update for the *current* transcript.
-                # This ensures any newly identified entities in this round get their first mention counted,
-                # and existing entities also get their count incremented if mentioned.
-                # The _update_importance_from_transcript method handles the mention_count, including setting 1 for first mention.
-                self._update_importance_from_transcript(transcript_to_process)
-                
-                self.entities_updated.emit(self.entities)
-                self.last_transcript_processed_idx = current_transcript_idx 
-
-            time.sleep(2) 
+            # Get the canonical name for the LLM-provided name
+            llm_provided_canonical_name = canonical_names[(name, canonical_type)]
+            
+            # Use this canonical name and type as the key for lookup in the persistent index
+            entity_key = (llm_provided_canonical_name, canonical_type)
+            existing_entity = entities_by_key.get(entity_key)
+
+            if existing_entity:
+                # Update existing entity
+                # The dict key already guarantees both names normalize to the same canonical form.
+                # Heuristic: Prefer longer name (more complete) or better casing
+                existing_name = existing_entity["name"]
+                name_is_longer = len(name) > len(existing_name)
+                name_is_capitalized = name[:1].isupper() and not existing_name[:1].isupper()
+                if name_is_longer or name_is_capitalized:
+                    # The old name's cached canonical form is no longer needed
+                    self._canonical_names.pop((existing_name, existing_entity["type"]), None)
+                    existing_entity["name"] = name # Update to the better raw name
+                    self._cheat_sheet_dirty = True
+                    # Re-key under the new name's canonical form, as a full rebuild would
+                    del entities_by_key[entity_key]
+                    entities_by_key[(self._canonical_name_of(existing_entity), canonical_type)] = existing_entity
+
+                if description and description != existing_entity["description"]:
+                    existing_entity["description"] = description
+                    self._cheat_sheet_dirty = True # Scores aren't part of the cheat sheet, so only name/description changes count
+                existing_entity["base_importance_score"] = max(existing_entity["base_importance_score"], base_importance_score) # Take max score
+
+                # Add all provided aliases to the dynamic alias map for the existing entity's canonical name
+                # Ensure the existing canonical name itself is mapped to its cleaned form
+                # This ensures the canonical name always maps to itself in its cleaned form
+                self.dynamic_alias_map[self._canonical_name_of(existing_entity).lower()] = existing_entity["name"]
+                self._register_aliases(existing_entity["name"], aliases, "existing")
+
+            else:
+                # Add new entity
+                new_entity_canonical_name = llm_provided_canonical_name
+                new_entity = {
+                    "name": new_entity_canonical_name, # Use the derived canonical name for the new entity
+                    "type": canonical_type,
+                    "description": description if description else "",
+                    "base_importance_score": base_importance_score,
+                    "mention_count": 0, # Initialize to 0, will be updated by _update_importance_from_transcript later (if also mentioned in current transcript)
+                    "first_mentioned_idx": current_transcript_idx
+                }
+                entities_by_key[entity_key] = new_entity
+                self._cheat_sheet_dirty = True
+
+                # Add current name and all its aliases to the dynamic alias map
+                self.dynamic_alias_map[new_entity_canonical_name.lower()] = new_entity_canonical_name
+                self._register_aliases(new_entity_canonical_name, aliases, "new")
+
+        self.entities = list(entities_by_key.values())
+        # Now that the entities list is updated, trigger mention count update for the *current* transcript.
+        # This ensures any newly identified entities in this round get their first mention counted,
+        # and existing entities also get their count incremented if mentioned.
+        # The _update_importance_from_transcript method handles the mention_count, including setting 1 for first mention.
+        self._update_importance_from_transcript(transcript_to_process)
+        
+        self.entities_version += 1
+        self.entities_updated.emit(self.entities)
+        self.last_transcript_processed_idx = current_transcript_idx
+        if self._debug_messages:
+            self.llm_log.emit({"type": "debug_batch", "message": f"Reconciliation trace for transcript index {current_transcript_idx}", "data": self._debug_messages})
+            self._debug_messages = []
+
+    def _register_aliases(self, entity_name, aliases, kind):
+        """Points each LLM-provided alias at `entity_name` in the alias map, never stealing another entity's alias."""
+        alias_map = self.dynamic_alias_map
+        for alias_name in aliases:
+            # Keyed exactly as _normalize_for_comparison looks names up. The target entity is already known, so the
+            # similarity search (which would also register the alias as a canonical name of its own) is skipped.
+            alias_lower = normalize_name(alias_name)
+            if not alias_lower:
+                continue
+            # Add alias to map IF it's not already pointing to a different canonical entity
+            # This prevents "Apple" (fruit) mapping to "Apple" (company) if both exist.
+            if alias_map.get(alias_lower, entity_name) == entity_name:
+                alias_map[alias_lower] = entity_name
+                if self._debug_enabled:
+                    self._debug_messages.append(f"Added alias '{alias_name}' (norm: '{alias_lower}') for {kind} entity '{entity_name}'")
 
     def add_transcription(self, text):
         self.transcriptions.append(text) 
+        self._wake()
 
     def get_transcriptions(self):
         return self.transcriptions
@@ -481,9 +790,14 @@ class LLMThread(QThread):
     def get_entities(self):
         return self.entities
 
+    def get_entities_with_version(self):
+        """Returns the entities list together with its version, for callers that cache derived data."""
+        return self.entities, self.entities_version
+
     def get_alias_map(self):
         """Returns the current dynamic alias map."""
         return self.dynamic_alias_map
 
     def stop(self):
-        self.running = False
\ No newline at end of file
+        self.running = False
+        self._wake() # Let the loop notice the stop request immediately
\ No newline at end of file
@@ -0,0 +1,126 @@
+import functools
+import re
+
+# Pure string normalization used by entity reconciliation and mention counting.
+# Nothing in here touches Qt or LLM state, so every function can be cached or moved off-thread freely.
+
+_RE_PARENS = re.compile(r'\s*\([^)]*\)')
+_RE_NONALNUM = re.compile(r'[^a-z0-9\s]')
+_RE_NONALNUM_MIXED = re.compile(r'[^a-zA-Z0-9\s]')
+_RE_POSSESSIVE = re.compile(r"['’]\s*s?\b")
+_RE_POSSESSIVE_ANY_CASE = re.compile(r"'\s*[sS]?\b") # ASCII fast path, applied before lowercasing
+_RE_POSS_END = re.compile(r"'s?\b", re.IGNORECASE)
+# Leading "the ", "a ", "an " (in that order, each at most once), as the old startswith chain removed them
+_RE_LEAD_ARTICLES = re.compile(r'^(?:the \s*)?(?:a \s*)?(?:an \s*)?', re.IGNORECASE)
+
+# str.translate tables for ASCII text: each one lowercases and/or strips punctuation in a single C-level pass
+_ASCII_PUNCTUATION = [c for c in map(chr, range(128)) if not (c.isalnum() or c.isspace())]
+_ASCII_LOWER = {ord(c): ord(c.lower()) for c in map(chr, range(ord('A'), ord('Z') + 1))}
+_NORMALIZE_TABLE = {**_ASCII_LOWER, **{ord(c): ' ' for c in _ASCII_PUNCTUATION}} # lower + punctuation -> space
+_STRIP_LOWER_TABLE = {**_ASCII_LOWER, **{ord(c): None for c in _ASCII_PUNCTUATION}} # lower + drop punctuation
+_STRIP_TABLE = {ord(c): None for c in _ASCII_PUNCTUATION} # drop punctuation, keep case
+
+
+def _normalize_for_mention(text):
+    """
+    Mention-check normalization: lowercase, possessives dropped, punctuation turned into spaces and
+    whitespace collapsed.
+    """
+    if text.isascii():
+        if "'" in text:
+            text = _RE_POSSESSIVE_ANY_CASE.sub('', text) # Handles 's and s' (e.g., 'character's' or 'characters')
+        text = text.translate(_NORMALIZE_TABLE) # Lowercase and punctuation -> space in one pass
+    else:
+        text = text.lower()
+        text = _RE_POSSESSIVE.sub('', text)
+        text = _RE_NONALNUM.sub(' ', text) # Replace non-alphanumeric with space
+    return ' '.join(text.split()) # Reduce multiple spaces to single space
+
+
+@functools.lru_cache(maxsize=4096)
+def normalize_for_mention(name):
+    """_normalize_for_mention for entity names and aliases, which recur in every round."""
+    return _normalize_for_mention(name)
+
+
+@functools.lru_cache(maxsize=16)
+def normalize_transcript_for_mention(transcript):
+    """
+    _normalize_for_mention for transcript text. Only the snippets of the current context window
+    are ever reused, so these get a small cache of their own instead of evicting entity names.
+    """
+    return _normalize_for_mention(transcript)
+
+
+def strip_parenthesized(name):
+    """Removes parenthesized asides, e.g. 'Gandalf (the Grey)' -> 'Gandalf'."""
+    return _RE_PARENS.sub('', name).strip()
+
+
+@functools.lru_cache(maxsize=4096)
+def strip_name(name):
+    """Lowercases `name` and reduces it to single-spaced alphanumeric words. Names repeat across transcripts."""
+    if name.isascii():
+        stripped = name.translate(_STRIP_LOWER_TABLE)
+    else:
+        stripped = _RE_NONALNUM.sub('', name.lower())
+    return ' '.join(stripped.split())
+
+
+@functools.lru_cache(maxsize=4096)
+def normalize_name(name):
+    """The alias-map / similarity key for an entity name."""
+    return strip_name(strip_parenthesized(name))
+
+
+@functools.lru_cache(maxsize=4096)
+def clean_canonical_candidate(cleaned_base_name):
+    """Aggressive cleaning for a brand-new canonical name: leading article, possessives and punctuation."""
+    # Remove common articles and possessive endings for robust canonicalization
+    final_canonical_candidate = _RE_LEAD_ARTICLES.sub('', cleaned_base_name, count=1)
+    final_canonical_candidate = _RE_POSS_END.sub('', final_canonical_candidate).strip() # remove 's or s' at end of word
+    # remove non-alphanumeric (keep spaces), then reduce multiple spaces
+    if final_canonical_candidate.isascii():
+        final_canonical_candidate = final_canonical_candidate.translate(_STRIP_TABLE)
+    else:
+        final_canonical_candidate = _RE_NONALNUM_MIXED.sub('', final_canonical_candidate)
+    return ' '.join(final_canonical_candidate.split())
+
+
+class MentionMatcher:
+    """
+    Finds whole-word mentions of a fixed list of names in one pass over a text's word n-grams,
+    instead of one regex search per name. Names and text are compared in normalize_for_mention form,
+    which is single-space separated [a-z0-9] words, so word-sequence matching is equivalent to a
+    \\b-delimited search.
+    """
+    def __init__(self, names):
+        self._index = {} # Normalized name -> positions in `names`
+        self._max_words = {} # First word of a name -> word count of the longest name starting with it
+        for i, name in enumerate(names):
+            key = normalize_for_mention(name)
+            if not key:
+                continue
+            self._index.setdefault(key, []).append(i)
+            words = key.split(' ')
+            self._max_words[words[0]] = max(self._max_words.get(words[0], 0), len(words))
+
+    def _matches(self, text):
+        """Yields the normalized name of every whole-word mention in `text`, overlaps included."""
+        index = self._index
+        max_words = self._max_words
+        words = normalize_transcript_for_mention(text).split(' ')
+        for start, word in enumerate(words):
+            # Like the root of a trie: most words start no name at all and cost one dict lookup
+            longest = max_words.get(word)
+            if longest is None:
+                continue
+            for end in range(start + 1, min(start + longest, len(words)) + 1):
+                key = ' '.join(words[start:end])
+                if key in index:
+                    yield key
+
+    def mentioned_positions(self, text):
+        """Positions in `names` of the names mentioned in `text` at least once, in ascending order."""
+        index = self._index
+        return sorted({i for key in set(self._matches(text)) for i in index[key]})
@@ -1,60 +1,251 @@
+import string
 import numpy as np
-import whisper
 import threading
-import time
 import queue
 from PyQt5.QtCore import QThread, pyqtSignal
-from constants import TRANSCRIPT_CHUNK_DURATION_SECONDS
+from constants import TRANSCRIPT_CHUNK_DURATION_SECONDS, TRANSCRIPT_STREAM_STEP_SECONDS, WHISPER_MODEL_NAME, WHISPER_COMPUTE_TYPE, WHISPER_CPU_THREADS
+
+SAMPLE_RATE = 16000
+CHUNK_SAMPLES = SAMPLE_RATE * TRANSCRIPT_CHUNK_DURATION_SECONDS # Audio covered by one emitted transcript line
+# The rolling window is re-decoded after (at least) this much new audio; kept well below the window size
+STREAM_STEP_SAMPLES = min(CHUNK_SAMPLES, max(SAMPLE_RATE // 2, int(SAMPLE_RATE * TRANSCRIPT_STREAM_STEP_SECONDS)))
+WINDOW_SAMPLES = SAMPLE_RATE * 30 # Whisper's native input length; the rolling window never grows past it
+BACKLOG_BATCH_SIZE = 8 # Speech segments encoded together when decoding a backlog
+PROMPT_TAIL_CHARS = 200 # Committed text fed back as initial_prompt so decodes continue the sentence
+# Audio buffered ahead of the transcriber while Whisper is busy decoding. Past that the oldest samples
+# are overwritten, so a stalled model costs audio instead of unbounded memory.
+RING_CAPACITY_SAMPLES = CHUNK_SAMPLES * 3
+
+def _word_key(word):
+    """Words are compared across decodes without case, surrounding spaces or punctuation."""
+    return word.strip().strip(string.punctuation).lower()
+
 
 class TranscriptionThread(QThread):
+    """
+    Streams transcription with the Whisper-Streaming LocalAgreement-2 policy: a rolling window of
+    uncommitted audio is re-decoded every STREAM_STEP_SAMPLES, and a word is committed once two
+    consecutive decodes agree on it. Committed audio is trimmed off the window, and committed words
+    are emitted as one transcript line per TRANSCRIPT_CHUNK_DURATION_SECONDS of audio, so
+    downstream code can keep mapping line numbers to time. Unlike cutting fixed chunks, a
+    word is never split across two lines.
+    """
     transcription = pyqtSignal(str)
     error_signal = pyqtSignal(str)
+    model_loading = pyqtSignal()
+    model_ready = pyqtSignal()
 
     def __init__(self):
         super().__init__()
-        try:
-            self.model = whisper.load_model("small.en")
-        except Exception as e:
-            self.error_signal.emit(f"Failed to load Whisper model: {e}")
-            self.model = None
+        # Loaded by the first run() rather than here, so constructing the thread doesn't hold up the GUI
+        self.model = None
+        self._batched_model = None
+        self._get_speech_timestamps = None # faster_whisper.vad.get_speech_timestamps, bound with the model
 
-        self.audio_buffer = np.array([], dtype=np.float32)
+        # Fixed-size circular buffer: samples are copied in at most two slices and never reallocated
+        self._ring = np.empty(RING_CAPACITY_SAMPLES, dtype=np.float32)
+        self._read = 0 # Ring index of the oldest buffered sample
+        self._avail = 0 # Number of buffered samples
+        self._claimed = 0 # Samples just before _read that run() is still copying out; never overwritten
+        # Rolling window of audio that hasn't been committed yet, always starting at a word boundary
+        self._window = np.empty(WINDOW_SAMPLES, dtype=np.float32)
+        self._window_fill = 0
+        self._window_offset = 0 # Absolute sample index of self._window[0]
+        self._hypothesis = [] # (end seconds within the window, word) of the last decode's uncommitted words
+        self._pending_words = [] # Committed words not yet emitted as a transcript line
+        self._emitted_until = 0 # Absolute sample index the last emitted line covers audio up to
+        self._prompt_tail = ""
+        self.dropped_samples = 0 # Samples overwritten because the transcriber fell behind
         self.running = False
         self.buffer_lock = threading.Lock()
+        self._data_ready = threading.Condition(self.buffer_lock) # Notified once a stream step is buffered, and on stop
         self._stop_event = threading.Event()
 
     def run(self):
         self.running = True
         self._stop_event.clear()
+        if not self._ensure_model():
+            return
 
         while self.running:
-            audio_to_process = None
-            with self.buffer_lock:
-                if len(self.audio_buffer) >= 16000 * TRANSCRIPT_CHUNK_DURATION_SECONDS: 
-                    audio_to_process = self.audio_buffer[:16000 * TRANSCRIPT_CHUNK_DURATION_SECONDS].copy()
-                    self.audio_buffer = self.audio_buffer[16000 * TRANSCRIPT_CHUNK_DURATION_SECONDS:]
-            
-            if audio_to_process is not None:
-                try:
-                    if audio_to_process.dtype != np.float32:
-                        audio_to_process = audio_to_process.astype(np.float32) / 32768.0
-
-                    result = self.model.transcribe(audio_to_process, language="en")
-                    if result["text"].strip():
-                        self.transcription.emit(result["text"])
-                except Exception as e:
-                    self.error_signal.emit(f"Transcription Error: {e}")
-                    # print(f"Transcription Error: {e}", file=sys.stderr) # Removed sys.stderr import
-            time.sleep(0.1)
+            # Sleeps until a step of new audio is buffered or stop() is called; a slow decode simply
+            # makes the next step longer
+            new_samples = self._take_audio()
+            if not new_samples:
+                break
+
+            try:
+                self._process_window(new_samples)
+            except Exception as e:
+                self.error_signal.emit(f"Transcription Error: {e}")
+                # print(f"Transcription Error: {e}", file=sys.stderr) # Removed sys.stderr import
+
+        # Nothing more will be decoded: the latest hypothesis is the best text there is for the tail
+        self._pending_words.extend(word for _, word in self._hypothesis)
+        self._hypothesis = []
+        self._emit_pending()
+
+    def _ensure_model(self):
+        """Loads the Whisper model on first use. Returns False if it couldn't be loaded."""
+        if self.model is not None:
+            return True
+        self.model_loading.emit()
+        try:
+            # faster-whisper pulls in CTranslate2, tokenizers, PyAV and onnxruntime; importing it here keeps
+            # all of that off the GUI's startup path
+            from faster_whisper import BatchedInferencePipeline, WhisperModel
+            from faster_whisper.vad import get_speech_timestamps # Silero VAD (ONNX), run on new audio before decoding
+            # CTranslate2 with quantized (int8 by default) GEMMs instead of the reference FP32 PyTorch model.
+            # Its encode/generate/align calls run in C++ with the GIL released, so decoding stays in-process
+            # rather than in a worker process: only the thin per-segment Python glue competes with the GUI.
+            model = WhisperModel(WHISPER_MODEL_NAME, device="cpu", compute_type=WHISPER_COMPUTE_TYPE,
+                                 cpu_threads=WHISPER_CPU_THREADS)
+            # Encodes a long window's VAD segments as one batch instead of one after another
+            self._batched_model = BatchedInferencePipeline(model=model)
+            self._get_speech_timestamps = get_speech_timestamps
+            self.model = model
+        except Exception as e:
+            self.error_signal.emit(f"Failed to load Whisper model: {e}")
+            return False
+        self.model_ready.emit()
+        return True
+
+    def _take_audio(self):
+        """
+        Waits for STREAM_STEP_SAMPLES buffered samples and moves everything buffered (as far as it fits)
+        onto the end of the rolling window. Returns how many samples were added, or 0 once the thread is
+        stopped. The lock only covers claiming the samples; the copy itself runs unlocked, and add_audio
+        leaves the claimed region alone until it is released.
+        """
+        space = WINDOW_SAMPLES - self._window_fill # _process_window always leaves at least one step free
+        with self._data_ready:
+            self._data_ready.wait_for(lambda: self._avail >= STREAM_STEP_SAMPLES or self._stop_event.is_set())
             if self._stop_event.is_set():
+                return 0
+            n = min(self._avail, space)
+            start = self._read
+            self._read = (start + n) % len(self._ring)
+            self._avail -= n
+            self._claimed = n
+        out = self._window[self._window_fill:self._window_fill + n]
+        first = min(n, len(self._ring) - start)
+        np.copyto(out[:first], self._ring[start:start + first])
+        np.copyto(out[first:], self._ring[:n - first])
+        self._window_fill += n
+        with self.buffer_lock:
+            self._claimed = 0
+        return n
+
+    def _process_window(self, new_samples):
+        """Re-decodes the rolling window and commits the words this decode and the previous one agree on."""
+        if not self._hypothesis and not self._get_speech_timestamps(self._window[self._window_fill - new_samples:self._window_fill]):
+            # Nothing is waiting for agreement and the new audio holds no speech: Whisper isn't run at all.
+            # The VAD costs about a millisecond per second of audio; a decode costs the full encoder pass.
+            if self._window_fill > STREAM_STEP_SAMPLES:
+                self._trim_window(self._window_fill - STREAM_STEP_SAMPLES)
+            self._maybe_emit()
+            return
+
+        # Greedy decoding (openai-whisper's default) with word timestamps; the VAD filter skips
+        # silent stretches of the window instead of decoding them. faster-whisper computes the log-mel
+        # features itself, from the speech left after that filter, so there is no per-window mel to
+        # keep across steps: which samples get featurized changes whenever the speech segments do.
+        audio = self._window[:self._window_fill]
+        options = dict(language="en", beam_size=1, vad_filter=True, word_timestamps=True,
+                       initial_prompt=self._prompt_tail or None)
+        if new_samples >= CHUNK_SAMPLES:
+            # The previous decode took long enough for a whole chunk to pile up: the window now
+            # holds several utterances, so their segments go through the encoder as one batch
+            segments, _ = self._batched_model.transcribe(audio, batch_size=BACKLOG_BATCH_SIZE, **options)
+        else:
+            segments, _ = self.model.transcribe(audio, condition_on_previous_text=False, **options)
+        words = [(word.end, word.word) for segment in segments for word in segment.words] # Decoded lazily, here
+
+        # LocalAgreement-2: the longest common prefix of the last two hypotheses is confirmed
+        agreed = 0
+        for (_, previous), (_, current) in zip(self._hypothesis, words):
+            if _word_key(previous) != _word_key(current):
                 break
+            agreed += 1
+        self._hypothesis = words[agreed:]
+        self._commit(words[:agreed])
+
+        if not words and self._window_fill > STREAM_STEP_SAMPLES:
+            # No speech at all: keep only the newest step, which may hold the start of a word
+            self._trim_window(self._window_fill - STREAM_STEP_SAMPLES)
+        elif self._window_fill > WINDOW_SAMPLES - STREAM_STEP_SAMPLES:
+            # The window is about to outgrow Whisper's input without agreement; accept the latest hypothesis
+            self._commit(self._hypothesis)
+            self._hypothesis = []
+            if self._window_fill > WINDOW_SAMPLES - STREAM_STEP_SAMPLES:
+                self._trim_window(self._window_fill - STREAM_STEP_SAMPLES)
+
+        self._maybe_emit()
+
+    def _commit(self, words):
+        """Moves confirmed words to the pending line and trims their audio off the window."""
+        if not words:
+            return
+        self._pending_words.extend(word for _, word in words)
+        self._prompt_tail = (self._prompt_tail + "".join(word for _, word in words))[-PROMPT_TAIL_CHARS:]
+        # Hypothesis timestamps stay relative to the window start, so they are shifted along with it
+        cut = min(self._window_fill, max(0, int(words[-1][0] * SAMPLE_RATE)))
+        self._trim_window(cut)
+        cut_seconds = cut / SAMPLE_RATE
+        self._hypothesis = [(end - cut_seconds, word) for end, word in self._hypothesis]
+
+    def _trim_window(self, cut):
+        """Drops the first `cut` samples of the rolling window."""
+        remaining = self._window_fill - cut
+        self._window[:remaining] = self._window[cut:self._window_fill] # Overlapping 1-D forward copy: done in place, no temporary
+        self._window_fill = remaining
+        self._window_offset += cut
+
+    def _maybe_emit(self):
+        if self._window_offset - self._emitted_until >= CHUNK_SAMPLES:
+            self._emit_pending()
+
+    def _emit_pending(self):
+        text = "".join(self._pending_words)
+        self._pending_words = []
+        self._emitted_until = self._window_offset
+        if text.strip():
+            self.transcription.emit(text)
 
     def add_audio(self, audio_data):
+        """
+        Buffers a batch from AudioCaptureThread.audio_data. The producer already delivers mono float32
+        in [-1, 1) at SAMPLE_RATE, converted once per batch on the capture thread, so nothing is converted
+        or checked here: audio_data must be a 1-D float32 array.
+        """
+        capacity = len(self._ring)
         with self.buffer_lock:
-            if audio_data.dtype != np.float32:
-                audio_data = audio_data.astype(np.float32) / 32768.0
-            self.audio_buffer = np.append(self.audio_buffer, audio_data.flatten())
+            free = capacity - self._avail - self._claimed
+            n = audio_data.size
+            if n > free:
+                # Make room by dropping the oldest unread samples, then, if that isn't enough, the
+                # oldest part of this batch. While run() is copying a claimed region out, the unread
+                # samples sit past it: writing on from the end of the buffered audio would run through
+                # the claimed samples before reaching the dropped ones, so only this batch is cut then.
+                overflow = 0 if self._claimed else min(n - free, self._avail)
+                self._read = (self._read + overflow) % capacity
+                self._avail -= overflow
+                free += overflow
+                if n > free:
+                    overflow += n - free
+                    audio_data = audio_data[n - free:]
+                    n = free
+                self.dropped_samples += overflow
+            write = (self._read + self._avail) % capacity
+            first = min(n, capacity - write)
+            np.copyto(self._ring[write:write + first], audio_data[:first])
+            np.copyto(self._ring[:n - first], audio_data[first:])
+            self._avail += n
+            if self._avail >= STREAM_STEP_SAMPLES:
+                self._data_ready.notify()
 
     def stop(self):
         self.running = False
-        self._stop_event.set()
\ No newline at end of file
+        self._stop_event.set()
+        with self._data_ready:
+            self._data_ready.notify_all()
\ No newline at end of file
@@ -1,35 +1,130 @@
+import io
 import json # Not directly used but often helpful for debugging DDGS results
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from duckduckgo_search import DDGS
-from PyQt5.QtCore import QThread, pyqtSignal
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+from constants import WEB_SEARCH_CACHE_PATH, WEB_SEARCH_CACHE_TTL_SECONDS
 
-class WebSearchThread(QThread):
+_RE_NON_WORD = re.compile(r'\W+')
+_SEARCH_BACKENDS = ("html", "lite") # Separate DuckDuckGo endpoints; whichever answers first is used
+
+
+def _cache_key(title):
+    """Titles differing only in case, spacing or punctuation share one cache entry."""
+    return _RE_NON_WORD.sub('_', title.lower()).strip('_')
+
+
+def _open_cache():
+    os.makedirs(os.path.dirname(WEB_SEARCH_CACHE_PATH), exist_ok=True)
+    conn = sqlite3.connect(WEB_SEARCH_CACHE_PATH)
+    conn.execute("CREATE TABLE IF NOT EXISTS web_context (key TEXT PRIMARY KEY, context TEXT, stored_at REAL)")
+    return conn
+
+
+def cached_web_context(title):
+    """The web context stored for `title` within WEB_SEARCH_CACHE_TTL_SECONDS, or None."""
+    try:
+        conn = _open_cache()
+        try:
+            row = conn.execute("SELECT context, stored_at FROM web_context WHERE key = ?", (_cache_key(title),)).fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None # A broken cache only costs a search
+    if row and time.time() - row[1] < WEB_SEARCH_CACHE_TTL_SECONDS:
+        return row[0]
+    return None
+
+
+def _store_web_context(title, context):
+    try:
+        conn = _open_cache()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO web_context VALUES (?, ?, ?)", (_cache_key(title), context, time.time()))
+        finally:
+            conn.close()
+    except (sqlite3.Error, OSError):
+        pass
+
+
+def _search_context(query, backend):
+    """One DDGS text search against `backend`, formatted as '- title: body' lines."""
+    context = io.StringIO()
+    with DDGS() as ddgs:
+        # Results are written out as they are yielded, without collecting them in a list first
+        for r in ddgs.text(query, max_results=5, backend=backend):
+            if r.get('body'):
+                line = ("- ", r['title'], ": ", r['body'])
+            elif r.get('link'):
+                line = ("- ", r['title'], " (", r['link'], ")")
+            else:
+                continue
+            if context.tell():
+                context.write("\n")
+            context.writelines(line)
+    return context.getvalue()
+
+
+def _race_search(query):
+    """
+    Queries DuckDuckGo's HTML and Lite endpoints at the same time and returns the first non-empty
+    context. The slower request is left to finish in the background; its result is discarded.
+    Returns "" if a backend completed without results; raises the last error only if every backend failed.
+    """
+    executor = ThreadPoolExecutor(max_workers=len(_SEARCH_BACKENDS))
+    futures = [executor.submit(_search_context, query, backend) for backend in _SEARCH_BACKENDS]
+    executor.shutdown(wait=False)
+    error = None
+    succeeded = False
+    for future in as_completed(futures):
+        try:
+            context = future.result()
+        except Exception as e:
+            error = e
+            continue
+        if context:
+            return context
+        succeeded = True # An empty result is still an answer: "no results", not an error
+    if error is not None and not succeeded:
+        raise error
+    return ""
+
+
+class WebSearchSignals(QObject):
+    """QRunnable isn't a QObject, so WebSearchTask emits through this."""
     context_ready = pyqtSignal(str)
     error_signal = pyqtSignal(str)
 
+
+class WebSearchTask(QRunnable):
+    """
+    Searches DuckDuckGo for a title's plot context. A one-shot fetch, so it runs on a QThreadPool
+    worker rather than a dedicated QThread. Found context is cached on disk, so callers should try
+    cached_web_context(title) first and only start this task on a miss. Keep a reference to
+    `signals`: the pool deletes the task itself once run() returns.
+    """
     def __init__(self, title):
         super().__init__()
         self.title = title
+        self.signals = WebSearchSignals()
 
     def run(self):
+        signals = self.signals
         try:
-            search_query = f"{self.title} plot summary OR overview"
-            with DDGS() as ddgs:
-                results = list(ddgs.text(search_query, max_results=5))
-
-            context_lines = []
-            for r in results:
-                if r.get('body'):
-                    context_lines.append(f"- {r['title']}: {r['body']}")
-                elif r.get('link'):
-                    context_lines.append(f"- {r['title']} ({r['link']})")
-            
-            full_context = "\n".join(context_lines)
+            full_context = _race_search(f"{self.title} plot summary OR overview")
 
             if not full_context:
-                self.error_signal.emit(f"Warning: No significant web context found for '{self.title}'. LLM may operate with limited external knowledge.")
+                signals.error_signal.emit(f"Warning: No significant web context found for '{self.title}'. LLM may operate with limited external knowledge.")
                 full_context = f"No specific plot context found for the content titled '{self.title}'."
+            else:
+                _store_web_context(self.title, full_context) # Only real results; an empty search is retried next time
 
-            self.context_ready.emit(full_context)
+            signals.context_ready.emit(full_context)
         except Exception as e:
-            self.error_signal.emit(f"Error during web search for '{self.title}': {str(e)}. LLM will operate without external context.")
-            self.context_ready.emit(f"Web search failed. No external context provided for '{self.title}'.")
\ No newline at end of file
+            signals.error_signal.emit(f"Error during web search for '{self.title}': {str(e)}. LLM will operate without external context.")
+            signals.context_ready.emit(f"Web search failed. No external context provided for '{self.title}'.")
@@ -1,3 +1,52 @@
+import os
+
 # Constants for time calculation (approximate)
 # This assumes the TranscriptionThread processes fixed 10-second chunks.
-TRANSCRIPT_CHUNK_DURATION_SECONDS = 10
\ No newline at end of file
+TRANSCRIPT_CHUNK_DURATION_SECONDS = 10
+
+# Seconds of new audio between re-decodes of the streaming transcription window. Whisper's encoder
+# always runs on a padded 30 s input, so each step costs a full encoder pass however little audio is
+# new: a longer step cuts that work proportionally, at the cost of words being confirmed later.
+TRANSCRIPT_STREAM_STEP_SECONDS = float(os.environ.get("TRANSCRIPT_STREAM_STEP_SECONDS") or 1)
+
+# Speech-to-text model, run through faster-whisper (CTranslate2)
+WHISPER_MODEL_NAME = "small.en"
+# CTranslate2 weight/compute precision. "int8" keeps weights at a quarter of FP32's memory traffic;
+# CTranslate2 has no int4 mode. Override with e.g. WHISPER_COMPUTE_TYPE=int8_float32 or float32.
+WHISPER_COMPUTE_TYPE = os.environ.get("WHISPER_COMPUTE_TYPE") or "int8"
+# CTranslate2 dispatches its int8 GEMMs to oneDNN/MKL, which use AVX-512 VNNI where the CPU has it.
+# Those kernels scale with physical cores, so the default leaves the other half of the logical CPUs
+# to the GUI and the LLM client. Set WHISPER_CPU_THREADS to override.
+WHISPER_CPU_THREADS = max(1, int(os.environ.get("WHISPER_CPU_THREADS") or (os.cpu_count() or 2) // 2))
+
+# Web context found for a title is reused for this long (seconds) instead of searching DuckDuckGo again
+WEB_SEARCH_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".narrative_navigator", "web_search_cache.sqlite3")
+WEB_SEARCH_CACHE_TTL_SECONDS = 7 * 24 * 3600
+
+# Local Ollama server used by the LLM and chat threads
+OLLAMA_HOST = "http://localhost:11434"
+
+# Transcripts sent to Ollama concurrently by the entity extraction thread. The server only
+# batches them if it is started with the same OLLAMA_NUM_PARALLEL setting.
+LLM_MAX_PARALLEL_REQUESTS = max(1, int(os.environ.get("OLLAMA_NUM_PARALLEL") or 4))
+
+# When transcripts back up beyond LLM_MAX_PARALLEL_REQUESTS, up to this many consecutive snippets
+# share one request so the system prompt and cheat sheet are processed once for all of them.
+LLM_MAX_SNIPPETS_PER_REQUEST = 4
+
+# Characters of entity descriptions included in every extraction prompt's cheat sheet. Every known name is
+# always listed; past this budget the oldest entities are listed without their description.
+LLM_CHEAT_SHEET_MAX_DESCRIPTION_CHARS = 6000
+
+# Per-entity reconciliation traces (alias hits, similarity matches, mention counts) in the LLM log.
+# Off by default: they are produced for every entity of every transcript. Set LLM_DEBUG_LOGGING=1 to enable.
+LLM_DEBUG_LOGGING = os.environ.get("LLM_DEBUG_LOGGING", "") not in ("", "0")
+
+# Context window requested by every Ollama call. The LLM and chat threads share one model, and
+# Ollama reloads it whenever a request asks for a different num_ctx, so both must use this value.
+OLLAMA_NUM_CTX = 8192
+
+# Paragraph cap for the log, transcript and activity text views. Past it QTextDocument drops the oldest
+# blocks, so long sessions don't grow the documents (and their layout cost) without bound. The
+# transcript and logs are still written to files in full.
+UI_TEXT_DISPLAY_MAX_BLOCKS = 5000
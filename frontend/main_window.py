@@ -1,26 +1,83 @@
 import sys
+import functools
+import html
 import json
+import orjson
 import numpy as np
 import time 
+from collections import Counter, deque
 from datetime import datetime
+from operator import itemgetter
 import os # Import the os module for path operations
 
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout,
-    QHBoxLayout, QPushButton, QTextEdit, QTableWidget,
+    QHBoxLayout, QPushButton, QTextEdit, QPlainTextEdit, QTableWidget,
     QTableWidgetItem, QInputDialog, QSplitter, QLineEdit,
     QLabel, QFrame, QTabWidget, QScrollArea, QSizePolicy,
     QApplication, QStyle
 )
-from PyQt5.QtCore import QThread, pyqtSignal, Qt, QSize
-from PyQt5.QtGui import QIcon
+from PyQt5.QtCore import QSignalBlocker, QThread, QThreadPool, QTimer, pyqtSignal, Qt, QSize
+from PyQt5.QtGui import QColor, QFont, QIcon, QTextBlockFormat, QTextCursor, QTextCharFormat
 
 from backend.audio_capture import AudioCaptureThread
 from backend.transcription import TranscriptionThread
-from backend.web_search import WebSearchThread
+from backend.web_search import WebSearchTask, cached_web_context
 from backend.llm_processing import LLMThread
 from backend.chat_agent import ChatThread
-from constants import TRANSCRIPT_CHUNK_DURATION_SECONDS
+from constants import TRANSCRIPT_CHUNK_DURATION_SECONDS, UI_TEXT_DISPLAY_MAX_BLOCKS
+
+def _log_data_block(background, color=None):
+    """
+    Data block template for the LLM log. QPlainTextEdit.appendHtml drops block-level styling such as
+    <pre>'s font and background, so the data goes in an inline span that keeps its line breaks and indent.
+    """
+    style = f"white-space: pre; font-family: monospace; background-color: {background};"
+    if color:
+        style += f" color: {color};"
+    return f"<span style='{style}'>{{data}}</span>"
+
+# LLM log HTML per log type: (header template, data block template or None, whether data is JSON-dumped,
+# whether the data block is shown even when data is empty). Only the timestamp, message and data vary.
+_DEFAULT_LOG_FORMAT = ("<p style='margin-bottom: 5px;'>{ts} <b>[{label}]</b>: {msg}</p>", None, False, False)
+_DEBUG_LOG_FORMAT = ("<p style='color: #555555; margin-bottom: 5px;'>{ts} <b>[DEBUG]</b>: {msg}</p>",
+                     _log_data_block("#e0e0e0"), True, False)
+_LOG_FORMATS = {
+    "prompt": (_DEFAULT_LOG_FORMAT[0], _log_data_block("#e6e6fa"), True, True),
+    "raw_response": (_DEFAULT_LOG_FORMAT[0], _log_data_block("#f0f0f0"), False, True),
+    "parsed_entities": (_DEFAULT_LOG_FORMAT[0], _log_data_block("#f0f8ff"), True, True),
+    "chat_prompt": (_DEFAULT_LOG_FORMAT[0], _log_data_block("#e0e7ff"), True, True),
+    "chat_response": (_DEFAULT_LOG_FORMAT[0], _log_data_block("#f0f2f5"), False, True),
+    "error": ("<p style='color: #CC0000; margin-bottom: 5px;'>{ts} <b>[ERROR]</b>: {msg}</p>",
+              _log_data_block("#ffe6e6", "#CC0000"), False, False),
+    "warning": ("<p style='color: #FF8C00; margin-bottom: 5px;'>{ts} <b>[WARNING]</b>: {msg}</p>",
+                _log_data_block("#fff8e6"), True, False),
+    "debug": _DEBUG_LOG_FORMAT,
+    "debug_batch": _DEBUG_LOG_FORMAT,
+    "status": ("<p style='color: #337ab7; margin-bottom: 5px;'>{ts} <b>[STATUS]</b>: {msg}</p>",
+               _log_data_block("#eef4fa"), False, False),
+}
+
+_PARSED_ENTITY_FIELDS = itemgetter("name", "type", "description", "base_importance_score") # Columns of the parsed-entities table
+
+def _pretty_json(data):
+    """Indented JSON for log output. orjson does this in C; json (which indents in pure Python) covers what orjson rejects."""
+    try:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+    except TypeError:
+        return json.dumps(data, indent=2, ensure_ascii=False)
+
+THREAD_STOP_TIMEOUT_SECONDS = 5 # How long stopping/closing waits for worker threads before warning about them
+
+def _remaining_ms(deadline):
+    return max(0, int((deadline - time.monotonic()) * 1000))
+
+# Card descriptions only change when the LLM rewrites them, so every refresh re-truncates the same strings
+@functools.lru_cache(maxsize=2048)
+def _truncate_description(description_text, max_desc_length=80):
+    if len(description_text) > max_desc_length:
+        description_text = description_text[:max_desc_length].strip() + "..."
+    return description_text
 
 class NarrativeNavigator(QMainWindow):
     def __init__(self):
@@ -33,11 +90,55 @@ class NarrativeNavigator(QMainWindow):
         self.transcription_thread = TranscriptionThread()
         self.llm_thread = LLMThread()
         self.chat_thread = None
-        self.web_search_thread = None
+        self.web_search_signals = None # Signals of the in-flight WebSearchTask, kept alive until it reports
         self.content_title = ""
         self.minimum_display_score = 3 
         
         self.cheat_sheet_column_widths = {} 
+        self._chat_streaming = False # True while an AI answer is being streamed into chat_display
+        self._chat_cursor = None # Insertion point of the answer being streamed
+        # Chat messages are inserted with these formats instead of HTML, so nothing goes through the rich-text parser.
+        # Role -> (header text, header char format, body block format)
+        self._chat_styles = {}
+        for role, header, color, background in (("user", "User:", "#333333", "#e0e7ff"), ("ai", "AI:", "#6a0dad", "#f0f2f5")):
+            header_format = QTextCharFormat()
+            header_format.setForeground(QColor(color))
+            header_format.setFontWeight(QFont.Bold)
+            body_block_format = QTextBlockFormat()
+            body_block_format.setBackground(QColor(background))
+            body_block_format.setBottomMargin(10)
+            self._chat_styles[role] = (header, header_format, body_block_format)
+        self._chat_header_block_format = QTextBlockFormat()
+        self._chat_header_block_format.setBottomMargin(5)
+        self._chat_body_format = QTextCharFormat() # Plain format so the body does not inherit the header style
+        self._story_element_cards = {} # (name, type) -> card shown in the Story Elements tab
+        self._parsed_entities_columns_sized = False
+        self._table_rows = {} # Table -> rows it was last filled with by _populate_table
+        self._last_entities_key = None # Hash of the entity fields the last refresh displayed
+        self._story_elements_shown = ([], []) # Latest (entities, first-mentioned times) for the Story Elements tab
+        self._lazy_tabs = {} # Placeholder tab page -> function building its real content
+        self.story_elements_container_layout = None # Created with the Story Elements tab
+        self._key_character_cards = {} # (name, type) -> card shown under Key Characters
+        # Lines waiting for the next coalesced flush into transcript_display / recent_activity_display
+        self._transcript_buffer = []
+        self._activity_buffer = []
+        self._transcript_line_count = 0 # Shown by transcript_lines_count_label
+        self._summary_counts = (0, 0, 0) # Characters, locations and total elements shown in the overview cards
+        self._display_flush_timer = QTimer(self)
+        self._display_flush_timer.setSingleShot(True)
+        self._display_flush_timer.setInterval(100)
+        self._display_flush_timer.timeout.connect(self._flush_text_displays)
+        # LLM log messages wait here for the next flush; older ones than the display would keep are dropped
+        self._log_buffer = deque(maxlen=UI_TEXT_DISPLAY_MAX_BLOCKS)
+        self._log_flush_timer = QTimer(self)
+        self._log_flush_timer.setSingleShot(True)
+        self._log_flush_timer.setInterval(250)
+        self._log_flush_timer.timeout.connect(self._flush_log)
+        # Streamed chat answers arrive many times a second; the view is scrolled to the end at most ~30 times a second
+        self._chat_scroll_timer = QTimer(self)
+        self._chat_scroll_timer.setSingleShot(True)
+        self._chat_scroll_timer.setInterval(33)
+        self._chat_scroll_timer.timeout.connect(self._scroll_chat_to_end)
 
         # File paths for output
         self.output_dir = None
@@ -52,16 +153,30 @@ class NarrativeNavigator(QMainWindow):
         # Connect signals from backend threads to UI update slots
         self.audio_thread.audio_data.connect(self.transcription_thread.add_audio)
         self.audio_thread.error_signal.connect(lambda msg: self.update_llm_log_tabs({"type": "error", "message": msg})) 
+        self.audio_thread.dropped_frames.connect(lambda total: self.update_llm_log_tabs({"type": "warning", "message": f"Audio capture is falling behind: {total} frames dropped so far."}))
         
         self.transcription_thread.transcription.connect(self.handle_transcription)
         self.transcription_thread.error_signal.connect(lambda msg: self.update_llm_log_tabs({"type": "error", "message": msg}))
+        self.transcription_thread.model_loading.connect(lambda: self.update_llm_log_tabs({"type": "status", "message": "Loading Whisper model..."}))
+        self.transcription_thread.model_ready.connect(lambda: self.update_llm_log_tabs({"type": "status", "message": "Whisper model loaded."}))
         
         self.llm_thread.entities_updated.connect(self.update_entity_displays) 
         self.llm_thread.llm_log.connect(self.update_llm_log_tabs)
 
+        # Whisper loads in the background while the title is entered and searched for; until recording
+        # starts the thread just waits for audio. toggle_processing's start() is then a no-op.
+        self.transcription_thread.start()
         self.get_content_title_and_context()
 
     def init_ui(self):
+        # Entity card icons, rendered once and shared by every card (QPixmap is implicitly shared)
+        self._entity_icons = {
+            "Characters": self.style().standardIcon(QStyle.SP_MessageBoxInformation).pixmap(QSize(16, 16)),
+            "Locations": self.style().standardIcon(QStyle.SP_DirIcon).pixmap(QSize(16, 16)),
+            "Organizations": self.style().standardIcon(QStyle.SP_DesktopIcon).pixmap(QSize(16, 16)),
+        }
+        self._default_entity_icon = self.style().standardIcon(QStyle.SP_FileIcon).pixmap(QSize(16, 16))
+
         main_container = QWidget()
         self.setCentralWidget(main_container)
         main_layout = QVBoxLayout(main_container)
@@ -120,10 +235,12 @@ class NarrativeNavigator(QMainWindow):
         self.tab_widget.setObjectName("mainTabWidget")
         content_splitter.addWidget(self.tab_widget)
 
+        # Story Elements and AI Chat are only built when first opened; the other tabs receive text
+        # from the start (transcript lines, log messages) and are built right away
         self.overview_tab_page = self._create_overview_tab()
-        self.story_elements_tab_page = self._create_story_elements_tab()
+        self.story_elements_tab_page = self._create_lazy_tab(self._create_story_elements_tab)
         self.live_transcript_tab_page = self._create_live_transcript_tab()
-        self.ai_chat_tab_page = self._create_ai_chat_tab()
+        self.ai_chat_tab_page = self._create_lazy_tab(self._create_ai_chat_tab)
         self.llm_log_tab_page = self._create_llm_log_tab() 
 
         self.tab_widget.addTab(self.overview_tab_page, "Overview")
@@ -131,6 +248,8 @@ class NarrativeNavigator(QMainWindow):
         self.tab_widget.addTab(self.live_transcript_tab_page, "Live Transcript")
         self.tab_widget.addTab(self.ai_chat_tab_page, "AI Chat")
         self.tab_widget.addTab(self.llm_log_tab_page, "LLM Log")
+        self.tab_widget.currentChanged.connect(self._build_lazy_tab)
+        self.tab_widget.currentChanged.connect(self._flush_log_if_shown)
 
         right_panel = QWidget()
         right_panel.setObjectName("rightPanel")
@@ -162,12 +281,32 @@ class NarrativeNavigator(QMainWindow):
         for i, width in self.cheat_sheet_column_widths.items():
             self.cheat_sheet_table.setColumnWidth(i, width)
 
+        # Connected after the initial widths are applied, and refreshes never set widths, so this slot only
+        # ever sees user resizes
         self.cheat_sheet_table.horizontalHeader().sectionResized.connect(self._on_cheat_sheet_column_resized)
 
         content_splitter.addWidget(right_panel)
         content_splitter.setSizes([800, 400]) 
         main_layout.addWidget(content_splitter)
 
+    def _create_lazy_tab(self, factory):
+        """An empty tab page that _build_lazy_tab fills with factory()'s page when it is first shown."""
+        placeholder = QWidget()
+        self._lazy_tabs[placeholder] = factory
+        return placeholder
+
+    def _build_lazy_tab(self, index):
+        placeholder = self.tab_widget.widget(index)
+        factory = self._lazy_tabs.pop(placeholder, None)
+        if factory is None:
+            return
+        layout = QVBoxLayout(placeholder)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(factory())
+        if placeholder is self.story_elements_tab_page:
+            # Catch up on the entity updates that arrived while the tab didn't exist yet
+            self._sync_entity_cards(self.story_elements_container_layout, self._story_element_cards, *self._story_elements_shown)
+
     def _on_cheat_sheet_column_resized(self, logicalIndex, oldSize, newSize):
         """Slot to remember user-resized column widths."""
         self.cheat_sheet_column_widths[logicalIndex] = newSize
@@ -207,6 +346,7 @@ class NarrativeNavigator(QMainWindow):
         self.recent_activity_display.setReadOnly(True)
         self.recent_activity_display.setPlaceholderText("Latest story elements and transcript updates...")
         self.recent_activity_display.setFixedHeight(150)
+        self.recent_activity_display.document().setMaximumBlockCount(UI_TEXT_DISPLAY_MAX_BLOCKS)
         recent_activity_layout.addWidget(self.recent_activity_display)
         tab_layout.addWidget(recent_activity_widget)
 
@@ -286,14 +426,7 @@ class NarrativeNavigator(QMainWindow):
         card_layout.setSpacing(5) 
 
         icon_label = QLabel()
-        if entity_data["type"] == "Characters":
-            icon_label.setPixmap(self.style().standardIcon(QStyle.SP_MessageBoxInformation).pixmap(QSize(16, 16)))
-        elif entity_data["type"] == "Locations":
-            icon_label.setPixmap(self.style().standardIcon(QStyle.SP_DirIcon).pixmap(QSize(16, 16)))
-        elif entity_data["type"] == "Organizations":
-            icon_label.setPixmap(self.style().standardIcon(QStyle.SP_DesktopIcon).pixmap(QSize(16, 16)))
-        else: 
-            icon_label.setPixmap(self.style().standardIcon(QStyle.SP_FileIcon).pixmap(QSize(16, 16)))
+        icon_label.setPixmap(self._entity_icons.get(entity_data["type"], self._default_entity_icon))
         card_layout.addWidget(icon_label)
 
         element_name = QLabel(entity_data["name"])
@@ -309,12 +442,7 @@ class NarrativeNavigator(QMainWindow):
         separator.setStyleSheet("color: #aaaaaa; margin: 0 5px;")
         card_layout.addWidget(separator)
 
-        description_text = entity_data.get("description", "No description available")
-        max_desc_length = 80 
-        if len(description_text) > max_desc_length:
-            description_text = description_text[:max_desc_length].strip() + "..."
-        
-        description = QLabel(description_text)
+        description = QLabel(self._entity_card_description(entity_data))
         description.setProperty("property", "descriptionLabel") 
         description.setWordWrap(False) 
         description.setTextFormat(Qt.PlainText) 
@@ -326,9 +454,54 @@ class NarrativeNavigator(QMainWindow):
         first_mentioned = QLabel(f"First mentioned: {first_mentioned_time}")
         first_mentioned.setProperty("property", "timeLabel") 
         card_layout.addWidget(first_mentioned)
+
+        # Kept on the card so _sync_entity_cards can update an existing card instead of rebuilding it
+        card.description_label = description
+        card.first_mentioned_label = first_mentioned
         
         return card
 
+    def _entity_card_description(self, entity_data):
+        return _truncate_description(entity_data.get("description", "No description available"))
+
+    def _first_mentioned_times(self, entities):
+        """mm:ss of each entity's first mention, with the arithmetic done for all of them at once."""
+        first_mentioned_idx = np.fromiter((e.get("first_mentioned_idx", 0) for e in entities), dtype=np.int64, count=len(entities))
+        minutes, seconds = np.divmod(first_mentioned_idx * TRANSCRIPT_CHUNK_DURATION_SECONDS, 60)
+        return [f"{m:02d}:{s:02d}" for m, s in zip(minutes.tolist(), seconds.tolist())]
+
+    def _sync_entity_cards(self, layout, cards, entities, time_strs):
+        """
+        Makes `layout` show one card per entity, in order, ahead of its trailing stretch, with
+        `time_strs` the matching first-mentioned times. `cards` maps
+        (name, type) to the card currently shown for it: cards of entities that are still displayed are
+        updated in place and moved if needed, so a refresh only builds widgets for newly shown entities.
+        """
+        wanted = [((entity["name"], entity["type"]), entity) for entity in entities]
+        wanted_keys = {key for key, _ in wanted}
+        for key in [key for key in cards if key not in wanted_keys]:
+            card = cards.pop(key)
+            layout.removeWidget(card)
+            card.setParent(None)
+            card.deleteLater()
+
+        for position, ((key, entity), time_str) in enumerate(zip(wanted, time_strs)):
+            card = cards.get(key)
+            if card is None:
+                card = cards[key] = self._create_entity_card(entity, time_str)
+            else:
+                description_text = self._entity_card_description(entity)
+                if card.description_label.text() != description_text:
+                    card.description_label.setText(description_text)
+                first_mentioned_text = f"First mentioned: {time_str}"
+                if card.first_mentioned_label.text() != first_mentioned_text:
+                    card.first_mentioned_label.setText(first_mentioned_text)
+                item = layout.itemAt(position)
+                if item is not None and item.widget() is card:
+                    continue
+                layout.removeWidget(card)
+            layout.insertWidget(position, card)
+
     def _create_live_transcript_tab(self):
         tab_page = QWidget()
         tab_layout = QVBoxLayout(tab_page)
@@ -354,6 +527,7 @@ class NarrativeNavigator(QMainWindow):
         self.transcript_display = QTextEdit()
         self.transcript_display.setReadOnly(True)
         self.transcript_display.setPlaceholderText("Live transcription will appear here...")
+        self.transcript_display.document().setMaximumBlockCount(UI_TEXT_DISPLAY_MAX_BLOCKS)
         tab_layout.addWidget(self.transcript_display)
         
         return tab_page
@@ -417,11 +591,15 @@ class NarrativeNavigator(QMainWindow):
 
         raw_log_tab = QWidget()
         raw_log_layout = QVBoxLayout(raw_log_tab)
-        self.llm_raw_log_display = QTextEdit()
+        # QPlainTextEdit lays out only the visible lines, so log spam doesn't cost a full-document relayout
+        self.llm_raw_log_display = QPlainTextEdit()
         self.llm_raw_log_display.setReadOnly(True)
         self.llm_raw_log_display.setPlaceholderText("Raw LLM prompts and responses will appear here...")
+        self.llm_raw_log_display.setMaximumBlockCount(UI_TEXT_DISPLAY_MAX_BLOCKS)
+        self.llm_raw_log_display.setCenterOnScroll(False)
         raw_log_layout.addWidget(self.llm_raw_log_display)
         self.llm_log_tabs.addTab(raw_log_tab, "Raw Interactions")
+        self.llm_log_tabs.currentChanged.connect(self._flush_log_if_shown)
 
         parsed_entities_tab = QWidget()
         parsed_entities_layout = QVBoxLayout(parsed_entities_tab)
@@ -438,10 +616,12 @@ class NarrativeNavigator(QMainWindow):
 
         errors_warnings_tab = QWidget()
         errors_warnings_layout = QVBoxLayout(errors_warnings_tab)
-        self.llm_error_warnings_display = QTextEdit()
+        self.llm_error_warnings_display = QPlainTextEdit()
         self.llm_error_warnings_display.setReadOnly(True)
         self.llm_error_warnings_display.setPlaceholderText("LLM-related errors and warnings will appear here...")
-        self.llm_error_warnings_display.setStyleSheet("QTextEdit { color: #8B0000; }") 
+        self.llm_error_warnings_display.setMaximumBlockCount(UI_TEXT_DISPLAY_MAX_BLOCKS)
+        self.llm_error_warnings_display.setCenterOnScroll(False)
+        self.llm_error_warnings_display.setStyleSheet("QPlainTextEdit { color: #8B0000; }") 
         errors_warnings_layout.addWidget(self.llm_error_warnings_display)
         self.llm_log_tabs.addTab(errors_warnings_tab, "Errors & Warnings")
 
@@ -496,7 +676,7 @@ class NarrativeNavigator(QMainWindow):
             return
         try:
             with open(self.cheat_sheet_file_path, 'w', encoding='utf-8') as f:
-                json.dump(entities_data, f, indent=2, ensure_ascii=False)
+                f.write(_pretty_json(entities_data))
         except Exception as e:
             self.update_llm_log_tabs({"type": "error", "message": f"Failed to write cheat sheet to file: {e}"})
 
@@ -505,7 +685,7 @@ class NarrativeNavigator(QMainWindow):
             return
         try:
             with open(self.alias_map_file_path, 'w', encoding='utf-8') as f:
-                json.dump(alias_map_data, f, indent=2, ensure_ascii=False)
+                f.write(_pretty_json(alias_map_data))
         except Exception as e:
             self.update_llm_log_tabs({"type": "error", "message": f"Failed to write alias map to file: {e}"})
 
@@ -517,7 +697,7 @@ class NarrativeNavigator(QMainWindow):
                 f.write(f"{timestamp} [{log_type.upper()}]: {message}\n")
                 if data:
                     if isinstance(data, dict) or isinstance(data, list):
-                        f.write(json.dumps(data, indent=2, ensure_ascii=False) + "\n")
+                        f.write(_pretty_json(data) + "\n")
                     else:
                         f.write(str(data) + "\n")
                 f.write("---\n") # Separator for readability
@@ -566,11 +746,18 @@ class NarrativeNavigator(QMainWindow):
                 return
 
             self.llm_thread.set_content_title(self.content_title)
+            cached_context = cached_web_context(self.content_title)
+            if cached_context is not None:
+                # Searched recently: no network round trip and no thread needed
+                self.update_llm_log_tabs({"type": "status", "message": f"Using cached external context for: '{self.content_title}'."})
+                self.set_llm_external_context(cached_context)
+                return
             self.update_llm_log_tabs({"type": "status", "message": f"Searching for external context for: '{self.content_title}'..."})
-            self.web_search_thread = WebSearchThread(self.content_title)
-            self.web_search_thread.context_ready.connect(self.set_llm_external_context)
-            self.web_search_thread.error_signal.connect(lambda msg: self.update_llm_log_tabs({"type": "error", "message": msg})) 
-            self.web_search_thread.start()
+            web_search_task = WebSearchTask(self.content_title)
+            self.web_search_signals = web_search_task.signals
+            self.web_search_signals.context_ready.connect(self.set_llm_external_context)
+            self.web_search_signals.error_signal.connect(lambda msg: self.update_llm_log_tabs({"type": "error", "message": msg})) 
+            QThreadPool.globalInstance().start(web_search_task)
         else:
             self.update_llm_log_tabs({"type": "status", "message": "No content title provided. LLM will operate without specific external context."})
             self.llm_thread.set_external_context("No external context provided by user.")
@@ -579,9 +766,10 @@ class NarrativeNavigator(QMainWindow):
 
     def set_llm_external_context(self, context):
         self.llm_thread.set_external_context(context)
-        self.update_llm_log_tabs({"type": "status", "message": f"External context loaded for LLM (showing first 500 chars):\n<pre>{context[:500]}...</pre>"})
+        preview = context[:500] + "..."
         if len(context) > 500:
-            self.update_llm_log_tabs({"type": "status", "message": f"...\n(Full context is {len(context)} characters long)"})
+            preview += f"\n(Full context is {len(context)} characters long)"
+        self.update_llm_log_tabs({"type": "status", "message": "External context loaded for LLM (showing first 500 chars):", "data": preview})
         self.init_chat_thread()
         self.toggle_button.setEnabled(True)
         self.toggle_button.setText("Start Recording")
@@ -594,11 +782,13 @@ class NarrativeNavigator(QMainWindow):
 
         self.chat_thread = ChatThread(
             transcript_getter=self.llm_thread.get_transcriptions,
-            entities_getter=self.llm_thread.get_entities,
+            entities_getter=self.llm_thread.get_entities_with_version,
             content_title=self.content_title,
             external_context=self.llm_thread.external_context
         )
         self.chat_thread.chat_response.connect(self.display_chat_response)
+        self.chat_thread.chat_response_delta.connect(self.display_chat_response_delta)
+        self.chat_thread.chat_response_done.connect(self.finish_chat_response)
         self.chat_thread.chat_log.connect(self.update_llm_log_tabs) 
         self.chat_thread.start()
         self.update_llm_log_tabs({"type": "status", "message": "Chat thread initialized."})
@@ -622,145 +812,190 @@ class NarrativeNavigator(QMainWindow):
             self.update_llm_log_tabs({"type": "status", "message": "Processing stopped."})
 
     def stop_processing(self):
-        self.update_llm_log_tabs({"type": "debug", "message": "Stopping LLMThread..."})
-        self.llm_thread.stop()
-        self.llm_thread.wait(5000)
-        if self.llm_thread.isRunning():
-            self.update_llm_log_tabs({"type": "warning", "message": "LLMThread did not stop gracefully."})
-
-        self.update_llm_log_tabs({"type": "debug", "message": "Stopping TranscriptionThread..."})
-        self.transcription_thread.stop()
-        self.transcription_thread.wait(5000)
-        if self.transcription_thread.isRunning():
-            self.update_llm_log_tabs({"type": "warning", "message": "TranscriptionThread did not stop gracefully."})
-
-        self.update_llm_log_tabs({"type": "debug", "message": "Stopping AudioCaptureThread..."})
-        self.audio_thread.stop()
-        self.audio_thread.wait(5000)
-        if self.audio_thread.isRunning():
-            self.update_llm_log_tabs({"type": "warning", "message": "AudioCaptureThread did not stop gracefully."})
-        
+        self._stop_threads(self._processing_threads(), time.monotonic() + THREAD_STOP_TIMEOUT_SECONDS)
         self.update_llm_log_tabs({"type": "status", "message": "All processing threads requested to stop."})
 
+    def _processing_threads(self):
+        return [("LLMThread", self.llm_thread), ("TranscriptionThread", self.transcription_thread),
+                ("AudioCaptureThread", self.audio_thread)]
+
+    def _stop_threads(self, threads, deadline):
+        """
+        Asks every (name, thread) in `threads` to stop before waiting on any of them, so they wind down in
+        parallel, and waits on all of them until one shared `deadline` (time.monotonic()). A QThread still
+        running past the deadline is then waited for without a limit: destroying a running QThread aborts
+        the process, and terminate() can leave the interpreter's locks held. Only the audio capture thread,
+        a plain daemon thread, is given up on at the deadline.
+        """
+        for name, thread in threads:
+            self.update_llm_log_tabs({"type": "debug", "message": f"Stopping {name}..."})
+            thread.stop()
+        for name, thread in threads:
+            if thread.wait(_remaining_ms(deadline)):
+                continue
+            if isinstance(thread, QThread):
+                # E.g. TranscriptionThread inside the Whisper model load, which has no cancellation point
+                self.update_llm_log_tabs({"type": "warning", "message": f"{name} is still finishing its current call; waiting for it."})
+                thread.wait()
+            else:
+                self.update_llm_log_tabs({"type": "warning", "message": f"{name} did not stop gracefully."})
+
     def handle_transcription(self, text):
         if self.transcript_display:
-            self.transcript_display.append(text)
-            self.transcript_display.verticalScrollBar().setValue(self.transcript_display.verticalScrollBar().maximum())
-            current_lines = int(self.transcript_lines_count_label.text())
-            self.transcript_lines_count_label.setText(str(current_lines + 1))
+            self._transcript_buffer.append(text)
 
         self.llm_thread.add_transcription(text) 
-        self.recent_activity_display.append(f"Transcript: {text[:80].strip()}...")
-        self.recent_activity_display.verticalScrollBar().setValue(self.recent_activity_display.verticalScrollBar().maximum())
+        self._queue_activity(f"Transcript: {text[:80].strip()}...")
         
         self._write_transcript_line(text)
 
-    def update_entity_displays(self, all_entities):
-        for e in all_entities:
-            e["current_importance_score"] = e.get("base_importance_score", 0) + e.get("mention_count", 0)
+    def _queue_activity(self, text):
+        self._activity_buffer.append(text)
+        if not self._display_flush_timer.isActive():
+            self._display_flush_timer.start()
+
+    def _flush_text_displays(self):
+        """Appends everything buffered in the last 100 ms with one insert and one scroll per display."""
+        if self._transcript_buffer:
+            self._append_lines(self.transcript_display, self._transcript_buffer)
+            self._transcript_line_count += len(self._transcript_buffer)
+            self.transcript_lines_count_label.setText(str(self._transcript_line_count))
+            self._transcript_buffer = []
+        if self._activity_buffer:
+            self._append_lines(self.recent_activity_display, self._activity_buffer)
+            self._activity_buffer = []
+
+    def _append_lines(self, text_edit, lines):
+        cursor = text_edit.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        text = "\n".join(lines)
+        if not text_edit.document().isEmpty():
+            text = "\n" + text
+        with QSignalBlocker(text_edit): # One batch is one edit; the widget's textChanged has no listeners
+            cursor.insertText(text, QTextCharFormat())
+        text_edit.verticalScrollBar().setValue(text_edit.verticalScrollBar().maximum())
 
-        scores = [e["current_importance_score"] for e in all_entities]
+    def update_entity_displays(self, all_entities):
+        # Rounds that change nothing the displays show (e.g. no entities in a transcript) skip the refresh
+        entities_key = hash(tuple(
+            (e["name"], e["type"], e.get("description"), e.get("base_importance_score", 0), e.get("mention_count", 0), e.get("first_mentioned_idx", 0))
+            for e in all_entities
+        ))
+        if entities_key == self._last_entities_key:
+            self._write_alias_map(self.llm_thread.get_alias_map()) # Aliases can be added without any entity changing
+            return
+        self._last_entities_key = entities_key
+
+        # Scores are summed and their median taken in numpy; Python only reads the inputs and writes back the sums
+        count = len(all_entities)
+        scores = np.fromiter((e.get("base_importance_score", 0) for e in all_entities), dtype=np.int64, count=count)
+        scores += np.fromiter((e.get("mention_count", 0) for e in all_entities), dtype=np.int64, count=count)
+        for e, score in zip(all_entities, scores.tolist()):
+            e["current_importance_score"] = score
         
         display_threshold = self.minimum_display_score 
         
-        if scores:
-            median_score = np.median(scores)
+        if count:
+            median_score = np.median(scores) # Selection via np.partition, not a full sort
             display_threshold = max(self.minimum_display_score, median_score)
             self.update_llm_log_tabs({"type": "debug", "message": f"Calculated median importance score: {median_score:.2f}. Display threshold set to: {display_threshold:.2f}"})
         else:
             self.update_llm_log_tabs({"type": "debug", "message": "No entities yet to calculate median score. Display threshold is default minimum."})
 
-        filtered_for_display_tabs = [e for e in all_entities if e["current_importance_score"] >= display_threshold]
-        filtered_for_display_tabs.sort(key=lambda e: (e["type"], -e["current_importance_score"], e["name"].lower()))
-
-        # Clear and re-populate story elements
-        # Using the robust clear_layout_recursively helper
-        self.clear_layout_recursively(self.story_elements_container_layout)
-        
-        # Then add new widgets
-        for entity in filtered_for_display_tabs:
-            first_mentioned_time_seconds = entity.get("first_mentioned_idx", 0) * TRANSCRIPT_CHUNK_DURATION_SECONDS
-            minutes = int(first_mentioned_time_seconds // 60)
-            seconds = int(first_mentioned_time_seconds % 60)
-            time_str = f"{minutes:02d}:{seconds:02d}"
-
-            entity_card = self._create_entity_card(entity, time_str) 
-            self.story_elements_container_layout.addWidget(entity_card)
-        self.story_elements_container_layout.addStretch() # Add stretch back after clearing all and re-adding
-
-
-        # Clear and re-populate key characters
-        # Using the robust clear_layout_recursively helper
-        self.clear_layout_recursively(self.key_characters_container_layout)
-
-        key_characters = [e for e in filtered_for_display_tabs if e["type"] == "Characters"]
-        key_characters.sort(key=lambda e: -e["current_importance_score"]) 
-
-        for char_entity in key_characters:
-            first_mentioned_time_seconds = char_entity.get("first_mentioned_idx", 0) * TRANSCRIPT_CHUNK_DURATION_SECONDS
-            minutes = int(first_mentioned_time_seconds // 60)
-            seconds = int(first_mentioned_time_seconds % 60)
-            time_str = f"{minutes:02d}:{seconds:02d}"
-
-            char_card = self._create_entity_card(char_entity, time_str)
-            self.key_characters_container_layout.addWidget(char_card)
-        self.key_characters_container_layout.addStretch() # Add stretch back after clearing all and re-adding
-
-        self.cheat_sheet_table.setRowCount(len(all_entities))
-        
-        for col_idx in range(self.cheat_sheet_table.columnCount()):
-            if col_idx in self.cheat_sheet_column_widths:
-                self.cheat_sheet_table.setColumnWidth(col_idx, self.cheat_sheet_column_widths[col_idx])
-
-        all_entities_sorted_for_table = sorted(all_entities, key=lambda e: (e["type"], e["name"].lower()))
-
-        for i, entity in enumerate(all_entities_sorted_for_table):
-            self.cheat_sheet_table.setItem(i, 0, QTableWidgetItem(entity["name"]))
-            self.cheat_sheet_table.setItem(i, 1, QTableWidgetItem(entity["type"]))
-            description_item = QTableWidgetItem(entity.get("description", "No description available"))
-            self.cheat_sheet_table.setItem(i, 2, description_item)
-            self.cheat_sheet_table.setItem(i, 3, QTableWidgetItem(str(entity.get("base_importance_score", 0)))) 
-            self.cheat_sheet_table.setItem(i, 4, QTableWidgetItem(str(entity.get("mention_count", 0))))      
-            self.cheat_sheet_table.setItem(i, 5, QTableWidgetItem(str(entity.get("current_importance_score", 0)))) 
+        # Sort keys are gathered once; the threshold test and both sorts then run in numpy (lexsort is stable,
+        # and numpy compares strings by code point like Python does, so the orders match key-function sorts)
+        type_keys = np.array([e["type"] for e in all_entities])
+        name_keys = np.array([e["name"].lower() for e in all_entities])
+        shown = np.flatnonzero(scores >= display_threshold)
+        # (type, -score, lowercase name); lexsort takes its keys last-to-first
+        shown = shown[np.lexsort((name_keys[shown], -scores[shown], type_keys[shown]))]
+        filtered_for_display_tabs = [all_entities[i] for i in shown.tolist()]
+        type_counts = Counter(e["type"] for e in filtered_for_display_tabs)
+
+        # Story element and key character cards are diffed against the previous refresh, not rebuilt
+        time_strs = self._first_mentioned_times(filtered_for_display_tabs)
+        self._story_elements_shown = (filtered_for_display_tabs, time_strs)
+        if self.story_elements_container_layout is not None:
+            self._sync_entity_cards(self.story_elements_container_layout, self._story_element_cards, filtered_for_display_tabs, time_strs)
+
+        # Already ordered by descending score: filtered_for_display_tabs is sorted by (type, -score, name).
+        # Their time strings are picked out of the ones just formatted rather than computed again.
+        key_character_positions = [i for i, e in enumerate(filtered_for_display_tabs) if e["type"] == "Characters"]
+        key_characters = [filtered_for_display_tabs[i] for i in key_character_positions]
+        self._sync_entity_cards(self.key_characters_container_layout, self._key_character_cards, key_characters,
+                                [time_strs[i] for i in key_character_positions])
+
+        all_entities_sorted_for_table = [all_entities[i] for i in np.lexsort((name_keys, type_keys)).tolist()]
+        self._populate_table(self.cheat_sheet_table, [
+            (entity["name"],
+             entity["type"],
+             entity.get("description", "No description available"),
+             str(entity.get("base_importance_score", 0)),
+             str(entity.get("mention_count", 0)),
+             str(entity.get("current_importance_score", 0)))
+            for entity in all_entities_sorted_for_table
+        ])
             
-        char_count = sum(1 for e in filtered_for_display_tabs if e["type"] == "Characters")
-        loc_count = sum(1 for e in filtered_for_display_tabs if e["type"] == "Locations")
+        char_count = type_counts["Characters"]
+        loc_count = type_counts["Locations"]
         total_elements_displayed = len(filtered_for_display_tabs)
 
-        self.characters_count_label.setText(str(char_count))
-        self.locations_count_label.setText(str(loc_count))
-        self.total_elements_count_label.setText(str(total_elements_displayed))
+        summary_counts = (char_count, loc_count, total_elements_displayed)
+        if summary_counts != self._summary_counts: # Most refreshes leave the overview counts unchanged
+            self._summary_counts = summary_counts
+            self.characters_count_label.setText(str(char_count))
+            self.locations_count_label.setText(str(loc_count))
+            self.total_elements_count_label.setText(str(total_elements_displayed))
         
-        self.recent_activity_display.append(f"Entities updated: {len(all_entities)} total found, {total_elements_displayed} displayed (>= threshold).")
-        self.recent_activity_display.verticalScrollBar().setValue(self.recent_activity_display.verticalScrollBar().maximum())
+        self._queue_activity(f"Entities updated: {len(all_entities)} total found, {total_elements_displayed} displayed (>= threshold).")
 
         # Real-time saving to files
         self._write_cheat_sheet(all_entities)
         self._write_alias_map(self.llm_thread.get_alias_map())
 
-    def clear_layout_recursively(self, layout):
-        if layout is None:
+    def _populate_table(self, table, rows):
+        """
+        Writes `rows` (tuples of column strings) into `table`. Existing items are updated in place and
+        only cells that changed are touched, so a refresh mostly costs no allocations; the view repaints
+        once at the end instead of once per cell. Column widths are left alone: the cheat sheet's are
+        set in init_ui and afterwards only change when the user resizes them.
+        """
+        # Rows equal to what this table was last filled with are skipped without reading any text back from
+        # Qt. Entity dicts persist across refreshes, so those rows mostly hold the very same string objects
+        # and compare by identity.
+        previous_rows = self._table_rows.get(table, ())
+        table.setUpdatesEnabled(False)
+        try:
+            with QSignalBlocker(table): # No itemChanged/cellChanged per cell; nothing listens for them
+                table.setRowCount(len(rows))
+                for i, row in enumerate(rows):
+                    if i < len(previous_rows) and previous_rows[i] == row:
+                        continue
+                    for col_idx, text in enumerate(row):
+                        item = table.item(i, col_idx)
+                        if item is None:
+                            table.setItem(i, col_idx, QTableWidgetItem(text))
+                        elif item.text() != text:
+                            item.setText(text)
+            self._table_rows[table] = rows
+        finally:
+            table.setUpdatesEnabled(True)
+
+    def _flush_log(self):
+        """Appends the buffered LLM log messages in one go, once the log is on screen."""
+        if not self._log_buffer:
             return
-        # Iterate in reverse to safely remove items
-        # Taking items from index 0 repeatedly can be inefficient; iterating in reverse is better.
-        for i in reversed(range(layout.count())):
-            item = layout.takeAt(i)
-            
-            # Store the widget reference once to avoid re-evaluation
-            widget = item.widget() 
-
-            if widget is not None:
-                # If the item is a widget, remove it from the layout and delete it
-                widget.setParent(None) # Operate on the stored 'widget' variable
-                widget.deleteLater()   # Operate on the stored 'widget' variable
-            elif item.layout() is not None:
-                # If the item is a nested layout, clear it recursively
-                self.clear_layout_recursively(item.layout())
-            else:
-                # Handle spacer items or other types without widget/layout
-                # This correctly cleans up QSpacerItem objects.
-                del item
-
+        if not self.llm_raw_log_display.isVisible():
+            return # Keeps buffering; switching to the log's tab flushes it through _flush_log_if_shown
+        # Follows new messages while scrolled to the bottom, and leaves the view alone when the user scrolled up
+        with QSignalBlocker(self.llm_raw_log_display):
+            self.llm_raw_log_display.appendHtml("".join(self._log_buffer)) # A "\n" between entries would add a stray blank block
+        self._log_buffer.clear()
+
+    def _flush_log_if_shown(self, index):
+        """Slot for the outer and LLM Log tab widgets: messages buffered while the log was hidden appear once it is shown."""
+        self._log_flush_timer.stop()
+        self._flush_log()
 
     def update_llm_log_tabs(self, log_data):
         timestamp = datetime.now().strftime("[%H:%M:%S]")
@@ -769,46 +1004,41 @@ class NarrativeNavigator(QMainWindow):
         data = log_data.get("data")
 
         # Update UI display in LLM Log tab
-        formatted_message = f"<p style='margin-bottom: 5px;'>{timestamp} <b>[{log_type.upper()}]</b>: {message}</p>"
-        if log_type == "prompt":
-            formatted_message += f"<pre style='background-color: #e6e6fa; padding: 10px; border-radius: 5px;'><code>{json.dumps(data, indent=2)}</code></pre>"
-        elif log_type == "raw_response":
-            formatted_message += f"<pre style='background-color: #f0f0f0; padding: 10px; border-radius: 5px;'><code>{data}</code></pre>"
-        elif log_type == "parsed_entities":
-            formatted_message += f"<pre style='background-color: #f0f8ff; padding: 10px; border-radius: 5px;'><code>{json.dumps(data, indent=2)}</code></pre>"
-        elif log_type == "chat_prompt": 
-            formatted_message += f"<pre style='background-color: #e0e7ff; padding: 10px; border-radius: 5px;'><code>{json.dumps(data, indent=2)}</code></pre>"
-        elif log_type == "chat_response": 
-            formatted_message += f"<pre style='background-color: #f0f2f5; padding: 10px; border-radius: 5px;'><code>{data}</code></pre>"
-        elif log_type == "error":
-             formatted_message = f"<p style='color: #CC0000; margin-bottom: 5px;'>{timestamp} <b>[ERROR]</b>: {message}</p>"
-             if data: 
-                 formatted_message += f"<pre style='background-color: #ffe6e6; padding: 10px; border-radius: 5px; color: #CC0000;'><code>{data}</code></pre>"
-        elif log_type == "warning":
-            formatted_message = f"<p style='color: #FF8C00; margin-bottom: 5px;'>{timestamp} <b>[WARNING]</b>: {message}</p>"
-            if data: 
-                formatted_message += f"<pre style='background-color: #fff8e6; padding: 10px; border-radius: 5px;'><code>{json.dumps(data, indent=2)}</code></pre>"
-        elif log_type == "debug":
-            formatted_message = f"<p style='color: #555555; margin-bottom: 5px;'>{timestamp} <b>[DEBUG]</b>: {message}</p>"
-            if data:
-                formatted_message += f"<pre style='background-color: #e0e0e0; padding: 10px; border-radius: 5px;'><code>{json.dumps(data, indent=2)}</code></pre>"
-        elif log_type == "status": 
-            formatted_message = f"<p style='color: #337ab7; margin-bottom: 5px;'>{timestamp} <b>[STATUS]</b>: {message}</p>"
-
-        self.llm_raw_log_display.append(formatted_message)
-        self.llm_raw_log_display.verticalScrollBar().setValue(self.llm_raw_log_display.verticalScrollBar().maximum())
+        header, data_template, data_as_json, data_always = _LOG_FORMATS.get(log_type, _DEFAULT_LOG_FORMAT)
+        # Message and data come from the LLM, transcripts and exceptions, so '<' and '&' are escaped once here
+        # rather than left for the rich-text parser to mangle; timestamp and label are built locally
+        formatted_message = header.format(ts=timestamp, label=log_type.upper(), msg=html.escape(str(message), quote=False))
+        if data_template and (data_always or data):
+            data_text = _pretty_json(data) if data_as_json else str(data)
+            formatted_message += data_template.format(data=html.escape(data_text, quote=False))
+
+        self._log_buffer.append(formatted_message)
+        # The timer only runs while the log is on screen, so a hidden log costs no wake-ups
+        if not self._log_flush_timer.isActive() and self.llm_raw_log_display.isVisible():
+            self._log_flush_timer.start()
 
         if log_type == "parsed_entities":
-            self.llm_parsed_entities_table.setRowCount(len(data))
-            for i, entity in enumerate(data):
-                self.llm_parsed_entities_table.setItem(i, 0, QTableWidgetItem(entity.get("name", "")))
-                self.llm_parsed_entities_table.setItem(i, 1, QTableWidgetItem(entity.get("type", "")))
-                self.llm_parsed_entities_table.setItem(i, 2, QTableWidgetItem(entity.get("description", "")))
-                self.llm_parsed_entities_table.setItem(i, 3, QTableWidgetItem(str(entity.get("base_importance_score", ""))))
-            self.llm_parsed_entities_table.resizeColumnsToContents() 
+            try:
+                # entity_list_schema makes all four fields required, so they are read with one C-level itemgetter call
+                rows = [(name, entity_type, description, str(score))
+                        for name, entity_type, description, score in map(_PARSED_ENTITY_FIELDS, data)]
+            except KeyError:
+                rows = [
+                    (entity.get("name", ""),
+                     entity.get("type", ""),
+                     entity.get("description", ""),
+                     str(entity.get("base_importance_score", "")))
+                    for entity in data
+                ]
+            self._populate_table(self.llm_parsed_entities_table, rows)
+            if data and not self._parsed_entities_columns_sized:
+                # Measuring every cell is the expensive part of a batch, so columns are fitted to the first
+                # one and afterwards keep their (possibly user-adjusted) widths
+                self.llm_parsed_entities_table.resizeColumnsToContents() 
+                self._parsed_entities_columns_sized = True
 
         # Write to dedicated log files
-        if log_type in ["prompt", "raw_response", "parsed_entities", "chat_prompt", "chat_response", "debug", "status"]:
+        if log_type in ["prompt", "raw_response", "parsed_entities", "chat_prompt", "chat_response", "debug", "debug_batch", "status"]:
             self._write_llm_raw_log_line(timestamp, log_type, message, data)
         elif log_type in ["error", "warning"]:
             self._write_error_warning_log_line(timestamp, log_type, message, data)
@@ -817,33 +1047,64 @@ class NarrativeNavigator(QMainWindow):
         query = self.chat_input.text().strip()
         if not query:
             return
-        self.chat_display.append(f"<div style='color: #333333; margin-bottom: 5px; font-weight: bold;'>User:</div><div style='background-color: #e0e7ff; padding: 10px; border-radius: 8px; margin-bottom: 10px;'>{query}</div>")
+        self._start_chat_message("user").insertText(query, self._chat_body_format)
         self.chat_thread.add_chat_query(query)
         self.chat_input.clear()
-        self.chat_display.verticalScrollBar().setValue(self.chat_display.verticalScrollBar().maximum())
+        self._schedule_chat_scroll()
+
+    def _schedule_chat_scroll(self):
+        if not self._chat_scroll_timer.isActive():
+            self._chat_scroll_timer.start()
+
+    def _scroll_chat_to_end(self):
+        # Reading maximum() lays out the new text, so that happens here once rather than after every insert
+        scroll_bar = self.chat_display.verticalScrollBar()
+        scroll_bar.setValue(scroll_bar.maximum())
+
+    def _start_chat_message(self, role):
+        """Appends a `role` header and an empty message block to the chat; returns a cursor inside that block."""
+        header, header_format, body_block_format = self._chat_styles[role]
+        cursor = self.chat_display.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        if self.chat_display.document().isEmpty():
+            cursor.setBlockFormat(self._chat_header_block_format) # The document's first block is reused
+        else:
+            cursor.insertBlock(self._chat_header_block_format)
+        cursor.insertText(header, header_format)
+        cursor.insertBlock(body_block_format, self._chat_body_format)
+        return cursor
 
     def display_chat_response(self, response):
-        self.chat_display.append(f"<div style='color: #6a0dad; margin-bottom: 5px; font-weight: bold;'>AI:</div><div style='background-color: #f0f2f5; padding: 10px; border-radius: 8px; margin-bottom: 10px;'>{response}</div>")
-        self.chat_display.verticalScrollBar().setValue(self.chat_display.verticalScrollBar().maximum())
+        self._start_chat_message("ai").insertText(response, self._chat_body_format)
+        self._schedule_chat_scroll()
+
+    def display_chat_response_delta(self, delta):
+        if not self._chat_streaming:
+            self._chat_streaming = True
+            # One cursor for the whole answer: it stays at the end of the text it inserts, and a message appended
+            # below it meanwhile doesn't pull the rest of the answer after it
+            self._chat_cursor = self._start_chat_message("ai")
+        self._chat_cursor.insertText(delta, self._chat_body_format)
+        self._schedule_chat_scroll()
+
+    def finish_chat_response(self, response):
+        self._chat_streaming = False
+        self._chat_cursor = None
+        self._schedule_chat_scroll()
 
     def closeEvent(self, event):
         try:
             self.update_llm_log_tabs({"type": "status", "message": "Application closing. Initiating graceful shutdown of threads."})
-            self.stop_processing() # Ensure core processing threads are stopped
-
+            deadline = time.monotonic() + THREAD_STOP_TIMEOUT_SECONDS # Bounds the whole shutdown, not each thread
+            threads = self._processing_threads()
             if self.chat_thread and self.chat_thread.isRunning():
-                self.update_llm_log_tabs({"type": "debug", "message": "Stopping ChatThread..."})
-                self.chat_thread.stop()
-                self.chat_thread.wait(5000)
-                if self.chat_thread.isRunning():
-                    self.update_llm_log_tabs({"type": "warning", "message": "ChatThread did not stop gracefully."})
-
-            if self.web_search_thread and self.web_search_thread.isRunning():
-                self.update_llm_log_tabs({"type": "debug", "message": "Stopping WebSearchThread..."})
-                self.web_search_thread.quit() 
-                self.web_search_thread.wait(5000)
-                if self.web_search_thread.isRunning():
-                    self.update_llm_log_tabs({"type": "warning", "message": "WebSearchThread did not stop gracefully."})
+                threads.append(("ChatThread", self.chat_thread))
+            self._stop_threads(threads, deadline)
+
+            if self.web_search_signals is not None:
+                self.update_llm_log_tabs({"type": "debug", "message": "Waiting for web search tasks..."})
+                if not QThreadPool.globalInstance().waitForDone(_remaining_ms(deadline)):
+                    self.update_llm_log_tabs({"type": "warning", "message": "Web search did not finish before shutdown."})
 
             self.update_llm_log_tabs({"type": "status", "message": "All threads stopped. Application exiting."})
             event.accept()
@@ -1,36 +1,41 @@
+import functools
+
 # LLM system prompt for entity extraction
 base_system_prompt = """
-You are an AI designed to extract narrative entities from transcribed audio for a "cheat sheet" to help users understand a story.
+You extract narrative entities from transcribed audio for a "cheat sheet" that helps users follow a story.
 
-The content you are analyzing is titled: "{content_title}".
-Here is some external context about the content to help you identify relevant entities and their significance:
+Content title: "{content_title}".
+External context about the content:
 ---
 {external_context}
 ---
 
-Your primary goal is to identify *all identifiable* named entities that contribute to understanding the narrative. Be **exceptionally comprehensive** in your extraction. Do NOT filter entities based on your perceived importance for display; list all that are mentioned. The UI will handle dynamic filtering based on scores.
+Be **exceptionally comprehensive**: list every identifiable named entity that helps in understanding the narrative, however minor. Do NOT filter by importance; the UI filters by score.
 
-When identifying entities, be mindful of variations, nicknames, acronyms, or common misspellings. Always strive to use the most complete, formal, or specific name as the primary "name" for the entity.
-Additionally, if you identify alternative names, nicknames, acronyms, or slightly different spellings that refer to the *same* entity, include them in an "aliases" array for that entity. For example, if "United States" is the primary name, "US" and "USA" would be aliases.
+Use the most complete, formal name as "name". Put nicknames, acronyms, alternative spellings and likely mistranscriptions of the *same* entity in "aliases" (e.g. "United States" with aliases "US", "USA").
 
-**CRITICAL INSTRUCTION**: ONLY extract entities that are **EXPLICITLY MENTIONED** in the provided "Current transcript snippet" or "Recent context." **DO NOT** include entities based on general knowledge, previous interactions, or general examples. If an entity is not mentioned, it must not be in your output.
+**CRITICAL**: ONLY extract entities **EXPLICITLY MENTIONED** in the "Current transcript snippet" or "Recent context". Never add entities from general knowledge or earlier examples.
 
-**Entity Categorization (Use these EXACT names only):**
--   **Characters**: Specific named individuals, historical figures.
--   **Locations**: Places, settings, countries, cities.
--   **Organizations**: Groups, agencies, governments, corporations.
--   **Key Objects**: Distinctive items crucial to the plot or events.
--   **Concepts/Events**: Historical periods, specific significant dates/years (when representing an event), major conflicts, scientific advancements, named projects or programs.
+**Types (use these EXACT names):**
+-   **Characters**: named individuals, historical figures.
+-   **Locations**: places, settings, countries, cities.
+-   **Organizations**: groups, agencies, governments, corporations.
+-   **Key Objects**: distinctive items crucial to the plot.
+-   **Concepts/Events**: historical periods, significant dates/years, conflicts, scientific advances, named projects.
 
-- **Further Instructions for Entities:**
-    - Ensure "name" is non-empty for valid entities.
-    - If no identifiable entities are found in a snippet, return an empty "entities" list.
-    - Maintain context from conversation history; if an entity was previously identified, you can re-mention it to update its score.
-    - Provide brief descriptions (max 10 words), focusing on their narrative role or key characteristic.
+- "name" must be non-empty; return an empty "entities" list if nothing qualifies.
+- Previously identified entities may be returned again to update their score.
+- "description": at most 10 words, on the entity's narrative role.
+- "base_importance_score" (1-10): inherent narrative relevance, re-evaluated with all context so far. Characters, Locations, Organizations and Key Objects usually score **5-10** (10 = central); Concepts/Events **1-7** (6-7 = major plot event or core theme). Score significance, not mention frequency.
+"""
+# Split around the two placeholders once at import: rendering is then plain concatenation instead of
+# str.format re-scanning the whole template
+_PROMPT_PREFIX, _rest = base_system_prompt.split("{content_title}", 1)
+_PROMPT_MID, _PROMPT_SUFFIX = _rest.split("{external_context}", 1)
+del _rest
 
-- **Scoring Guidance for 'base_importance_score' (1-10):**
-    - This score reflects your assessment of its inherent relevance and criticality to the overall narrative, plot progression, or world-building, *re-evaluating its importance based on all context seen so far*.
-    -   **Characters, Locations, Organizations, Key Objects**: These generally hold more concrete and direct narrative weight. Assign a score typically in the range of **5-10**. A score of 10 indicates a central, foundational, or highly impactful entity.
-    -   **Concepts/Events**: These can vary greatly in their direct impact. Assign a score typically in the range of **1-7**. A higher score (6-7) implies a major plot event or a fundamental concept crucial to the story's core themes. A lower score (1-5) might be for more general themes or events that are less pivotal.
-    - Aim for a nuanced understanding: If an entity is frequently mentioned but isn't inherently narratively significant (e.g., a common object that isn't a 'Key Object'), its 'base_importance_score' should remain modest. If it's rarely mentioned but critically impacts the plot (e.g., a twist event, a hidden MacGuffin), its 'base_importance_score' should be high.
-"""
\ No newline at end of file
+# Title and context only change when content is (re)loaded, so each pair is rendered once per session
+@functools.lru_cache(maxsize=8)
+def build_system_prompt(content_title, external_context):
+    """base_system_prompt with the content title and external context filled in."""
+    return _PROMPT_PREFIX + content_title + _PROMPT_MID + external_context + _PROMPT_SUFFIX
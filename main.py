@@ -1,14 +1,22 @@
+import os
 import sys
+from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import QApplication
 from frontend.main_window import NarrativeNavigator
 
+STYLE_SHEET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'style.qss')
+
 if __name__ == "__main__":
+    # Application attributes only take effect when set before the QApplication is created.
+    # Coalescing high-frequency events keeps bursts of log/transcript appends from queuing a repaint each.
+    QApplication.setAttribute(Qt.AA_CompressHighFrequencyEvents, True)
+    QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps, True)
     app = QApplication(sys.argv)
 
     # Apply QSS stylesheet
     try:
-        with open('style.qss', 'r') as f:
-            app.setStyleSheet(f.read())
+        with open(STYLE_SHEET_PATH, 'rb') as f:
+            app.setStyleSheet(f.read().decode('utf-8'))
     except FileNotFoundError:
         print("Warning: 'style.qss' not found. UI will not be styled.", file=sys.stderr)
     except Exception as e:
@@ -0,0 +1,54 @@
+import importlib.util
+import unittest
+
+_HAVE_DEPENDENCIES = all(importlib.util.find_spec(name) for name in ("PyQt5", "ollama"))
+if _HAVE_DEPENDENCIES:
+    from backend.chat_agent import ChatThread
+
+
+class _FakeStream:
+    def __init__(self, on_close):
+        self._on_close = on_close
+
+    def __iter__(self):
+        yield {"message": {"content": "Answer."}}
+
+    def close(self):
+        self._on_close()
+
+
+class _FakeClient:
+    """Records chat requests; the thread is stopped once the first answer has been streamed."""
+    def __init__(self, thread):
+        self.thread = thread
+        self.chat_calls = []
+
+    def generate(self, **kwargs):
+        pass
+
+    def chat(self, **kwargs):
+        self.chat_calls.append(kwargs)
+        return _FakeStream(self.thread.stop)
+
+
+@unittest.skipUnless(_HAVE_DEPENDENCIES, "PyQt5 and ollama are required")
+class ChatBatchingTest(unittest.TestCase):
+    def test_queries_queued_before_pickup_are_answered_together(self):
+        thread = ChatThread(lambda: ["Gandalf arrives."], lambda: ([], 0), "Title", "Context")
+        client = thread._client = _FakeClient(thread)
+        logs = []
+        thread.chat_log.connect(logs.append)
+
+        thread.add_chat_query("Who is Gandalf?")
+        thread.add_chat_query("Where is Frodo?")
+        thread.run() # Synchronously, on this thread
+
+        self.assertEqual(len(client.chat_calls), 1)
+        user_content = client.chat_calls[0]["messages"][-1]["content"]
+        self.assertIn("1. Who is Gandalf?", user_content)
+        self.assertIn("2. Where is Frodo?", user_content)
+        self.assertTrue([log for log in logs if log["type"] == "chat_response"])
+
+
+if __name__ == "__main__":
+    unittest.main()